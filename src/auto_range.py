@@ -0,0 +1,73 @@
+import constants
+from light_sensor import LightSensor
+from light_sensor import range_factor
+
+
+class AutoRange:
+
+    LOWER_FRACTION = 0.05
+    UPPER_FRACTION = 0.80
+    TARGET_COUNTS = 0.5*LightSensor.TSL2591_MAX_COUNT_100MS
+
+    def __init__(self, light_sensor, gain_ratio_meter=None):
+        self.light_sensor = light_sensor
+        self.gain_ratio_meter = gain_ratio_meter
+        self.set_integration_times(constants.STR_TO_INTEGRATION_TIME.values())
+
+    def set_integration_times(self, integration_times):
+        # Ladder of (gain, integration time) settings in order of increasing
+        # sensitivity. Gain is the major step as the gain factors are widely
+        # spaced compared to the integration times.
+        integration_times = list(integration_times)
+        self.ladder = []
+        for gain in constants.STR_TO_GAIN.values():
+            for itime in integration_times:
+                self.ladder.append((gain, itime))
+        self.ladder.sort(key=lambda settings: range_factor(*settings))
+        self.overflow_step = len(integration_times)
+
+    @property
+    def index(self):
+        settings = (self.light_sensor.gain, self.light_sensor.integration_time)
+        try:
+            index = self.ladder.index(settings)
+        except ValueError:
+            # Settings not on ladder, e.g. set manually, use nearest.
+            index = self.find_index(self.light_sensor.range_factor)
+        return index
+
+    def find_index(self, factor):
+        # Most sensitive settings with range factor <= given factor
+        index = 0
+        for i, settings in enumerate(self.ladder):
+            if range_factor(*settings) <= factor:
+                index = i
+            else:
+                break
+        return index
+
+    def update(self, sample):
+        # Step the sensor settings so that the sample counts fall within the
+        # useful band. Returns True if the settings were changed. A gain
+        # switch may be held, see GainRatioMeter.
+        if self.gain_ratio_meter is not None:
+            self.gain_ratio_meter.add(sample)
+        index = self.index
+        counts = sample.counts
+        max_counts = sample.max_counts
+        if sample.is_overflow:
+            new_index = max(index - self.overflow_step, 0)
+        elif counts > self.UPPER_FRACTION*max_counts or counts < self.LOWER_FRACTION*max_counts:
+            new_factor = sample.range_factor*self.TARGET_COUNTS/max(counts,1)
+            new_index = self.find_index(new_factor)
+        else:
+            new_index = index
+        if new_index == index:
+            return False
+        gain, itime = self.ladder[new_index]
+        if self.gain_ratio_meter is not None and self.gain_ratio_meter.hold(sample, gain):
+            return False
+        self.light_sensor.gain = gain
+        self.light_sensor.integration_time = itime
+        return True
+
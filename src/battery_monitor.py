@@ -1,18 +1,39 @@
+import time
 import analogio
 import constants
 import ulab.numpy as np
 
 class BatteryMonitor:
 
+    # Battery voltage is sampled at a low rate on its own timer, rather than
+    # every loop, and lowpass filtered using the measured time between
+    # samples as the loop period depends on the sensor integration time.
+    # State of charge is looked up from a lipo discharge curve, interpolated
+    # once into a table with one entry per VOLT_TABLE_STEP.
+
     VOLT_NUM_INIT = 5 
     FREQ_CUTOFF = 0.02
 
+    # Lipo discharge curve, (voltage, percent) in increasing order
+    DISCHARGE_CURVE = (
+            (3.27,   0), (3.61,   5), (3.69,  10), (3.71,  15), (3.73,  20),
+            (3.75,  25), (3.77,  30), (3.79,  35), (3.80,  40), (3.82,  45),
+            (3.84,  50), (3.85,  55), (3.87,  60), (3.91,  65), (3.95,  70),
+            (3.98,  75), (4.02,  80), (4.08,  85), (4.11,  90), (4.15,  95),
+            (4.20, 100),
+            )
+    VOLT_TABLE_STEP = 0.01 
+
     def __init__(self):
         self.battery_ain = analogio.AnalogIn(constants.BATTERY_AIN_PIN) 
         self.lowpass = None
+        self.last_sample_time = None
+        self.percent_table = percent_table(self.DISCHARGE_CURVE, self.VOLT_TABLE_STEP)
 
     def update(self):
-        # Initialize lowpass filter
+        # Takes a new sample if the sample period has elapsed. Returns True
+        # if there was a new sample.
+        t = time.monotonic()
         if self.lowpass is None:
             # First reading or so is low for some reason. Throw a couple away 
             # rather than initialize lowpass filter to low value.
@@ -21,11 +42,15 @@ class BatteryMonitor:
             self.lowpass = LowpassFilter(
                     freq_cutoff = self.FREQ_CUTOFF, 
                     value = self.voltage_raw,  
-                    dt = constants.LOOP_DT
+                    dt = constants.BATTERY_SAMPLE_DT,
                     )
         else:
-            # Update filter on new reading
-            self.lowpass.update(self.voltage_raw)
+            dt = t - self.last_sample_time
+            if dt < constants.BATTERY_SAMPLE_DT:
+                return False
+            self.lowpass.update(self.voltage_raw, dt=dt)
+        self.last_sample_time = t
+        return True
 
     @property
     def voltage_lowpass(self):
@@ -38,6 +63,14 @@ class BatteryMonitor:
     def voltage_raw(self):
        return 2.0*ain_to_volt(self.battery_ain.value)
 
+    @property
+    def percent(self):
+        # State of charge from the filtered voltage
+        v_min = self.DISCHARGE_CURVE[0][0]
+        index = int((self.voltage_lowpass - v_min)/self.VOLT_TABLE_STEP + 0.5)
+        index = min(max(index, 0), len(self.percent_table) - 1)
+        return self.percent_table[index]
+
 
 class LowpassFilter:
 
@@ -46,17 +79,35 @@ class LowpassFilter:
         self.value = value
         self.freq_cutoff = freq_cutoff
 
-    @property
-    def freq_cutoff(self):
-        return self._alpha/((1.0-self._alpha)*2.0*np.pi*self.dt)
-
-    @freq_cutoff.setter
-    def freq_cutoff(self, freq):
-        self._alpha = (2.0*np.pi*self.dt*freq)/(2.0*np.pi*self.dt*freq+1)
+    def alpha(self, dt):
+        return (2.0*np.pi*dt*self.freq_cutoff)/(2.0*np.pi*dt*self.freq_cutoff + 1)
 
-    def update(self, new_value):
-        self.value = self._alpha*new_value + (1.0-self._alpha)*self.value
+    def update(self, new_value, dt=None):
+        # Uses the time step dt, when given, rather than the nominal one so
+        # the cutoff is correct for irregular sampling.
+        if dt is None:
+            dt = self.dt
+        alpha = self.alpha(dt)
+        self.value = alpha*new_value + (1.0 - alpha)*self.value
 
 
 def ain_to_volt(value):
     return 3.3*value/65536
+
+
+def percent_table(curve, step):
+    # Percent for each voltage step over the range of the curve, linearly
+    # interpolated between the curve points.
+    v_min = curve[0][0]
+    v_max = curve[-1][0]
+    num = int((v_max - v_min)/step + 0.5) + 1
+    table = bytearray(num)
+    k = 0
+    for i in range(num):
+        v = v_min + i*step
+        while k < len(curve) - 2 and v > curve[k+1][0]:
+            k += 1
+        (v0, p0), (v1, p1) = curve[k], curve[k+1]
+        p = p0 + (p1 - p0)*(v - v0)/(v1 - v0)
+        table[i] = int(min(max(p, 0), 100) + 0.5)
+    return table
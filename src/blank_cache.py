@@ -0,0 +1,113 @@
+import os
+import json
+import constants
+
+
+class BlankCache:
+
+    # Blank values, normalized by gain and integration time, keyed by the
+    # sensor settings they were taken with. When there is no blank for the
+    # requested settings a blank at the same gain is used, as normalizing by
+    # integration time is exact. A blank at another gain is only used once
+    # the ratio of the two gains has been measured, the nominal gain factors
+    # are not accurate enough. The measured scale of each gain relative to
+    # its nominal factor is a property of the sensor so is kept on clear.
+
+    FILE_NAME = constants.BLANKS_FILE
+
+    def __init__(self):
+        self.data = {}
+        self.last_key = None
+        self.gain_scale = {}
+
+    @property
+    def is_empty(self):
+        return not self.data
+
+    def has(self, gain, integration_time):
+        return (gain, integration_time) in self.data
+
+    def get(self, gain, integration_time):
+        # Returns None if there is no usable blank, the most recent blank is
+        # preferred
+        try:
+            return self.data[(gain, integration_time)]
+        except KeyError:
+            pass
+        if self.last_key is not None:
+            value = self.transfer(self.last_key, gain)
+            if value is not None:
+                return value
+        for key in self.data:
+            value = self.transfer(key, gain)
+            if value is not None:
+                return value
+        return None
+
+    def transfer(self, key, gain):
+        # Blank for key scaled to the given gain, None if the gain ratio is
+        # unknown
+        blank_gain = key[0]
+        value = self.data[key]
+        if blank_gain == gain:
+            return value
+        if not self.has_gain_ratio(blank_gain, gain):
+            return None
+        return value*self.gain_scale[gain]/self.gain_scale[blank_gain]
+
+    def has_gain_ratio(self, gain_0, gain_1):
+        return gain_0 in self.gain_scale and gain_1 in self.gain_scale
+
+    def set_gain_ratio(self, gain_0, value_0, gain_1, value_1):
+        # Normalized values of the same light at two gains. A gain whose scale
+        # is unknown is set relative to the other.
+        if not self.gain_scale:
+            self.gain_scale[gain_0] = 1.0
+        if gain_0 in self.gain_scale:
+            self.gain_scale[gain_1] = self.gain_scale[gain_0]*value_1/value_0
+        elif gain_1 in self.gain_scale:
+            self.gain_scale[gain_0] = self.gain_scale[gain_1]*value_0/value_1
+
+    def set(self, gain, integration_time, value):
+        self.data[(gain, integration_time)] = value
+        self.last_key = (gain, integration_time)
+
+    def clear(self):
+        self.data = {}
+        self.last_key = None
+
+    def load(self):
+        # Load blanks saved to flash. Entries with unknown settings are ignored.
+        if not self.FILE_NAME in os.listdir():
+            return
+        try:
+            with open(self.FILE_NAME, 'r') as f:
+                file_data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if type(file_data) != dict:
+            return
+        for key, value in file_data.items():
+            try:
+                gain_str, itime_str = key.split('/')
+                gain = constants.STR_TO_GAIN[gain_str]
+                itime = constants.STR_TO_INTEGRATION_TIME[itime_str]
+                value = float(value)
+            except (ValueError, TypeError, KeyError):
+                continue
+            self.set(gain, itime, value)
+
+    def save(self):
+        # Save blanks to flash. Returns False if the filesystem is not writable.
+        file_data = {}
+        for (gain, itime), value in self.data.items():
+            gain_str = constants.GAIN_TO_STR[gain]
+            itime_str = constants.INTEGRATION_TIME_TO_STR[itime]
+            file_data[f'{gain_str}/{itime_str}'] = value
+        try:
+            with open(self.FILE_NAME, 'w') as f:
+                json.dump(file_data, f)
+        except OSError:
+            return False
+        return True
+
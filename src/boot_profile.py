@@ -0,0 +1,26 @@
+import gc
+import time
+
+
+class BootProfile:
+
+    # Time and free memory at each stage of startup, relative to when the
+    # profile was created at the top of code.py. Memory is read without a
+    # gc.collect() so recording a stage doesn't change the boot time.
+
+    def __init__(self):
+        self.t_start = time.monotonic()
+        self.stages = []
+        self.stage('start')
+
+    def stage(self, name):
+        t = time.monotonic() - self.t_start
+        self.stages.append((name, t, gc.mem_free()))
+
+    def report_lines(self):
+        # One short line per stage, e.g. 'menu 1.42s 38k'
+        lines = []
+        for name, t, mem_free in self.stages:
+            lines.append(f'{name} {t:1.2f}s {mem_free//1024}k')
+        return lines
+
@@ -0,0 +1,74 @@
+import board
+import displayio
+import constants
+import fonts
+from screen import Screen
+from adafruit_display_text import label
+
+
+class CalibrateScreen(Screen):
+
+    SPACING_HEADER_LABEL = 10
+    SPACING_LINE_LABEL = 6
+    HEIGHT_LINE_LABEL = 10
+    NUM_LINE_LABEL = 5
+
+    def __init__(self):
+        super().__init__()
+
+        # Create background tile grid
+        self.tile_grid = self.create_background()
+        font_scale = 1
+
+        # Create header label
+        header_str = 'Calibrate'
+        text_color = constants.COLOR_TO_RGB['white']
+        self.header_label = label.Label(
+                fonts.font_14pt,
+                text = header_str,
+                color = text_color,
+                scale = font_scale,
+                anchor_point = (0.5, 1.0),
+                )
+        bbox = self.header_label.bounding_box
+        header_label_x = board.DISPLAY.width//2
+        header_label_y = bbox[3] + self.SPACING_HEADER_LABEL
+        self.header_label.anchored_position = (header_label_x, header_label_y)
+
+        # Create line labels
+        self.line_label_list = []
+        line_label_y = header_label_y
+        for i in range(self.NUM_LINE_LABEL):
+            line_label = label.Label(
+                    fonts.font_10pt,
+                    text = '',
+                    color = constants.COLOR_TO_RGB['white'],
+                    scale = font_scale,
+                    anchor_point = (0.0,1.0),
+                    )
+            line_label_y += self.HEIGHT_LINE_LABEL + self.SPACING_LINE_LABEL
+            line_label.anchored_position = (2, line_label_y)
+            self.line_label_list.append(line_label)
+
+        # Ceate display group and add items to it
+        self.group = displayio.Group()
+        self.group.append(self.tile_grid)
+        self.group.append(self.header_label)
+        for line_label in self.line_label_list:
+            self.group.append(line_label)
+
+    def set_header(self, header):
+        self.set_text(self.header_label, header)
+
+    def set_lines(self, lines, highlight=None):
+        # Set text of line labels, highlight is index of line shown in orange
+        for i, line_label in enumerate(self.line_label_list):
+            if i < len(lines):
+                self.set_text(line_label, lines[i])
+            else:
+                self.set_text(line_label, '')
+            if i == highlight:
+                self.set_color(line_label, constants.COLOR_TO_RGB['orange'])
+            else:
+                self.set_color(line_label, constants.COLOR_TO_RGB['white'])
+
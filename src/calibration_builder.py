@@ -0,0 +1,104 @@
+import ulab
+
+
+class CalibrationBuilderError(Exception):
+    pass
+
+
+class CalibrationBuilder:
+
+    # Least squares polynomial fit of value vs absorbance built up one
+    # standard at a time. The normal equations (A^T A) c = A^T y are updated
+    # as each standard is added so the fit never has to be rebuilt from the
+    # full set of points.
+
+    FIT_TYPE_TO_DEGREE = {'linear': 1, 'polynomial': 2}
+
+    def __init__(self, fit_type='linear'):
+        self.points = []
+        self.set_fit_type(fit_type)
+
+    def set_fit_type(self, fit_type):
+        # Changing the fit type rebuilds the normal equations from the points
+        self.fit_type = fit_type
+        self.degree = self.FIT_TYPE_TO_DEGREE[fit_type]
+        num_coef = self.degree + 1
+        self.ata = ulab.numpy.zeros((num_coef, num_coef))
+        self.aty = ulab.numpy.zeros((num_coef,))
+        points = self.points
+        self.points = []
+        for absorbance, value in points:
+            self.add(absorbance, value)
+
+    @property
+    def num_points(self):
+        return len(self.points)
+
+    @property
+    def min_points(self):
+        return self.degree + 1
+
+    def powers(self, absorbance):
+        # Powers of absorbance, highest first to match fit_coef order
+        return [absorbance**(self.degree - i) for i in range(self.degree + 1)]
+
+    def add(self, absorbance, value):
+        self.update(absorbance, value, 1.0)
+        self.points.append((absorbance, value))
+
+    def remove_last(self):
+        if self.points:
+            absorbance, value = self.points.pop()
+            self.update(absorbance, value, -1.0)
+
+    def update(self, absorbance, value, weight):
+        powers = self.powers(absorbance)
+        for i, p_i in enumerate(powers):
+            self.aty[i] += weight*p_i*value
+            for j, p_j in enumerate(powers):
+                self.ata[i,j] += weight*p_i*p_j
+
+    def solve(self):
+        # Returns fit coefficients, highest order first
+        if self.num_points < self.min_points:
+            error_msg = f'{self.fit_type} fit needs {self.min_points} standards'
+            raise CalibrationBuilderError(error_msg)
+        try:
+            ata_inv = ulab.numpy.linalg.inv(self.ata)
+        except ValueError:
+            raise CalibrationBuilderError('standards give singular fit')
+        coef = ulab.numpy.dot(ata_inv, self.aty)
+        return [float(c) for c in coef]
+
+    def evaluate(self, coef, absorbance):
+        value = 0.0
+        for c in coef:
+            value = value*absorbance + c
+        return value
+
+    def residuals(self, coef):
+        return [value - self.evaluate(coef, absorbance) for (absorbance, value) in self.points]
+
+    def r_squared(self, coef):
+        values = [value for (absorbance, value) in self.points]
+        mean = sum(values)/len(values)
+        ss_tot = sum([(value - mean)**2 for value in values])
+        ss_res = sum([res**2 for res in self.residuals(coef)])
+        if ss_tot == 0.0:
+            return 1.0 if ss_res == 0.0 else 0.0
+        return 1.0 - ss_res/ss_tot
+
+    def calibration_data(self, coef, units=None, led=None):
+        # Calibration entry in the calibrations.json schema
+        absorbances = [absorbance for (absorbance, value) in self.points]
+        data = {
+                'fit_type': self.fit_type,
+                'fit_coef': coef,
+                'range': {'min': min(absorbances), 'max': max(absorbances)},
+                }
+        if units is not None:
+            data['units'] = units
+        if led is not None:
+            data['led'] = led
+        return data
+
@@ -1,6 +1,9 @@
+import gc
 import os
 import ulab
 import json
+import struct
+import binascii
 import constants
 from collections import OrderedDict
 from json_settings_file import JsonSettingsFile
@@ -13,23 +16,453 @@ class Calibrations(JsonSettingsFile):
     FILE_TYPE = 'calibrations'
     FILE_NAME = constants.CALIBRATIONS_FILE
     LOAD_ERROR_EXCEPTION = CalibrationsError
-    ALLOWED_FIT_TYPES = ['linear', 'polynomial']
+    ALLOWED_FIT_TYPES = ['linear', 'polynomial', 'table']
+    MIN_TABLE_POINTS = 2
+    MAX_TABLE_POINTS = 100
+
+    SCAN_CHUNK_SIZE = 256
+    CACHE_SIZE = 4
+
+    COMPILED_FILE_NAME = constants.CALIBRATIONS_COMPILED_FILE
+    COMPILED_TEMP_FILE_NAME = f'{COMPILED_FILE_NAME}.tmp'
+    COMPILED_MAGIC = b'CALB'
+    COMPILED_VERSION = 1
+    COMPILED_HEADER_FORMAT = '<4sBIIIIH'
+    NONE_LENGTH = 0xff
+
+    # Calibrations are not held in memory. Only an index of the name, file
+    # offset, length and led of every valid calibration is kept. Entries are
+    # read and compiled on demand and a few are kept in a small cache. 
+    #
+    # When the json file is new or has changed it is scanned one entry at a
+    # time and the checked calibrations are written in packed binary form to
+    # the compiled file along with any errors, and indexed there. On later
+    # boots, if the size, mtime and crc32 of the json file match those stored
+    # in the compiled file header, the index is read sequentially from the 
+    # compiled file and the json file is not parsed or checked at all. The 
+    # crc is only read from the json file when the size and mtime match, when
+    # compiling it is computed during the scan. If the compiled file can't be
+    # written, the span of each entry in the json file is indexed instead.
 
     def __init__(self):
         super().__init__()
+        self.cache = OrderedDict()
+        self.group_cache = None
+        self.end_offset = None
+        self.has_members = False
+        self.is_compiled_index = False
+        self.all_units = []
+        self.scan_crc = 0
+
+    def load(self):
+        self.data = OrderedDict()
+        self.error_dict = OrderedDict()
+        self.cache = OrderedDict()
+        self.group_cache = None
+        self.end_offset = None
+        self.has_members = False
+        self.is_compiled_index = False
+        self.all_units = []
+        self.stat = self.file_stat()
+        if not self.FILE_NAME in os.listdir():
+            return
+        try:
+            if self.load_compiled():
+                return
+            index = self.compile()
+            if index is None:
+                # Read only filesystem, index into the json file instead
+                self.error_dict = OrderedDict()
+                self.has_members = False
+                self.all_units = []
+                with open(self.FILE_NAME, 'rb') as f:
+                    index = self.scan(f)
+        except (OSError, ValueError, MemoryError):
+            error_msg = f'unable to read {self.FILE_TYPE} file'
+            raise self.LOAD_ERROR_EXCEPTION(error_msg)
+        index.sort()
+        self.data = OrderedDict(index)
+        gc.collect()
+
+    def file_size_mtime(self):
+        stat = os.stat(self.FILE_NAME)
+        return stat[6], int(stat[8])
+
+    def file_crc(self):
+        # Reads the whole json file, so is only used to validate a compiled
+        # file whose size and mtime already match
+        crc = 0
+        with open(self.FILE_NAME, 'rb') as f:
+            while True:
+                chunk = f.read(self.SCAN_CHUNK_SIZE)
+                if not chunk:
+                    break
+                crc = binascii.crc32(chunk, crc)
+        return crc
+
+    def remove_file(self, file_name):
+        try:
+            os.remove(file_name)
+        except OSError:
+            pass
+
+    def compile(self):
+        # The compiled file is written under a temporary name and only 
+        # replaces the existing one once complete, so if the json file fails
+        # to load the compiled file indexed by the current calibrations is 
+        # left intact. Returns None if the compiled file can't be written.
+        try:
+            with open(self.COMPILED_TEMP_FILE_NAME, 'wb') as compiled_file:
+                index = self.scan_and_compile(compiled_file)
+            self.remove_file(self.COMPILED_FILE_NAME)
+            os.rename(self.COMPILED_TEMP_FILE_NAME, self.COMPILED_FILE_NAME)
+        except OSError:
+            self.remove_file(self.COMPILED_TEMP_FILE_NAME)
+            return None
+        except Exception:
+            self.remove_file(self.COMPILED_TEMP_FILE_NAME)
+            raise
+        self.is_compiled_index = True
+        return index
+
+    def scan_and_compile(self, compiled_file):
+        # Scan the json file writing records to the compiled file, then the 
+        # errors and finally the header once the number of records is known.
+        # The crc in the header is the one computed during the scan.
+        header_size = struct.calcsize(self.COMPILED_HEADER_FORMAT)
+        compiled_file.write(bytes(header_size))
+        with open(self.FILE_NAME, 'rb') as f:
+            index = self.scan(f, compiled_file)
+        compiled_file.write(struct.pack('<H', len(self.error_dict)))
+        for name, error_list in self.error_dict.items():
+            self.write_str(compiled_file, self.short_str(name))
+            compiled_file.write(struct.pack('<B', len(error_list)))
+            for error_msg in error_list:
+                self.write_str(compiled_file, self.short_str(error_msg))
+        compiled_file.seek(0)
+        compiled_file.write(struct.pack(
+            self.COMPILED_HEADER_FORMAT, 
+            self.COMPILED_MAGIC,
+            self.COMPILED_VERSION,
+            *self.file_size_mtime(),
+            self.scan_crc,
+            self.end_offset,
+            len(index),
+            ))
+        return index
+
+    def load_compiled(self):
+        # Read index and errors from the compiled file. Returns False if the
+        # compiled file is missing, out of date or corrupt.
+        if not self.COMPILED_FILE_NAME in os.listdir():
+            return False
+        index = []
+        error_dict = OrderedDict()
+        all_units = []
+        try:
+            with open(self.COMPILED_FILE_NAME, 'rb') as f:
+                header_size = struct.calcsize(self.COMPILED_HEADER_FORMAT)
+                header = struct.unpack(self.COMPILED_HEADER_FORMAT, f.read(header_size))
+                magic, version, size, mtime, crc, end_offset, num_records = header
+                if magic != self.COMPILED_MAGIC or version != self.COMPILED_VERSION:
+                    return False
+                if (size, mtime) != self.file_size_mtime():
+                    return False
+                if crc != self.file_crc():
+                    return False
+                for i in range(num_records):
+                    length, = struct.unpack('<H', f.read(2))
+                    offset = f.tell()
+                    name = self.read_str(f)
+                    led = self.read_str(f)
+                    units = self.read_str(f)
+                    if units is not None and not units in all_units:
+                        all_units.append(units)
+                    index.append((name, (offset, length, led)))
+                    f.seek(offset + length)
+                num_errors, = struct.unpack('<H', f.read(2))
+                for i in range(num_errors):
+                    name = self.read_str(f)
+                    num_msgs, = struct.unpack('<B', f.read(1))
+                    error_dict[name] = [self.read_str(f) for j in range(num_msgs)]
+        except (OSError, ValueError, struct.error):
+            return False
+        index.sort()
+        self.data = OrderedDict(index)
+        self.error_dict = error_dict
+        self.all_units = all_units
+        self.end_offset = end_offset
+        self.has_members = num_records > 0 or num_errors > 0
+        self.is_compiled_index = True
+        gc.collect()
+        return True
+
+    def scan(self, f, compiled_file=None):
+        # Single pass over the file tracking string and nesting state to find
+        # the span of each top level value. Each value is parsed and checked 
+        # on its own so that only one calibration is in memory at a time. 
+        # Returns a list of (name, (offset, length, led)) for valid entries,
+        # offsets are into the compiled file if one is given, else the json.
+        index = []
+        self.scan_crc = 0
+        depth = 0
+        in_string = False
+        escape = False
+        in_value = False
+        key_buf = None
+        value_buf = None
+        name = None
+        value_offset = 0
+        pos = 0
+        while True:
+            chunk = f.read(self.SCAN_CHUNK_SIZE)
+            if not chunk:
+                break
+            self.scan_crc = binascii.crc32(chunk, self.scan_crc)
+            seg_start = 0
+            for i, c in enumerate(chunk):
+                if in_string:
+                    if escape:
+                        escape = False
+                    elif c == 0x5c:  # backslash
+                        escape = True
+                    elif c == 0x22:  # quote
+                        in_string = False
+                        if key_buf is not None:
+                            key_buf.extend(chunk[seg_start:i+1])
+                            name = json.loads(key_buf.decode())
+                            key_buf = None
+                    continue
+                if c == 0x22:
+                    in_string = True
+                    if depth == 1 and not in_value:
+                        key_buf = bytearray()
+                        seg_start = i
+                elif c in (0x7b, 0x5b):  # { [
+                    if depth == 0 and c != 0x7b:
+                        error_msg = f'{self.FILE_TYPE} file incorrect format'
+                        raise self.LOAD_ERROR_EXCEPTION(error_msg)
+                    depth += 1
+                elif c in (0x7d, 0x5d):  # } ]
+                    depth -= 1
+                    if depth == 0:
+                        if in_value:
+                            value_buf.extend(chunk[seg_start:i])
+                            self.index_entry(index, name, value_buf, value_offset, pos + i, compiled_file)
+                            in_value = False
+                            value_buf = None
+                        self.end_offset = pos + i
+                elif depth == 1:
+                    if c == 0x3a and not in_value:  # colon
+                        in_value = True
+                        value_buf = bytearray()
+                        value_offset = pos + i + 1
+                        seg_start = i + 1
+                    elif c == 0x2c and in_value:  # comma
+                        value_buf.extend(chunk[seg_start:i])
+                        self.index_entry(index, name, value_buf, value_offset, pos + i, compiled_file)
+                        in_value = False
+                        value_buf = None
+                elif depth == 0 and c not in b' \t\r\n':
+                    error_msg = f'{self.FILE_TYPE} file incorrect format'
+                    raise self.LOAD_ERROR_EXCEPTION(error_msg)
+            if key_buf is not None:
+                key_buf.extend(chunk[seg_start:])
+                seg_start = 0
+            if in_value:
+                value_buf.extend(chunk[seg_start:])
+            pos += len(chunk)
+        if depth != 0 or in_string or self.end_offset is None:
+            raise ValueError('unexpected end of file')
+        return index
+
+    def index_entry(self, index, name, value_buf, offset, end, compiled_file=None):
+        # Parse and check one scanned calibration. If valid its packed record
+        # is written to the compiled file and indexed there, or without a 
+        # compiled file its span in the json file is indexed.
+        self.has_members = True
+        calibration = json.loads(value_buf.decode())
+        if not self.check_entry(name, calibration):
+            return
+        led = calibration.get('led', None)
+        if compiled_file is None:
+            index.append((name, (offset, end - offset, led)))
+        else:
+            record = self.pack(name, calibration)
+            compiled_file.write(struct.pack('<H', len(record)))
+            index.append((name, (compiled_file.tell(), len(record), led)))
+            compiled_file.write(record)
 
-    def check(self):
-        # Check each calibration for errors
-        for name, calibration in self.data.items():
-            error_list = []
-            error_list.extend(self.check_fit(name, calibration))
-            error_list.extend(self.check_range(name, calibration))
-            if error_list:
-                self.error_dict[name] = error_list
+    def check_entry(self, name, calibration):
+        # Returns True if the calibration is valid, errors are recorded
+        error_list = self.check_calibration(name, calibration)
+        if error_list:
+            self.error_dict[name] = error_list
+            return False
+        self.add_units(calibration.get('units', None))
+        return True
 
-        # Remove calibrations with errors
-        for name in self.error_dict:
-            del self.data[name]
+    def add_units(self, units):
+        # Distinct units of all calibrations, e.g. for preloading glyphs
+        if units is not None and not units in self.all_units:
+            self.all_units.append(units)
+
+    def pack(self, name, calibration):
+        # Packed binary record of a checked calibration. Name and led come 
+        # first so the index can be read without unpacking the rest.
+        buf = bytearray()
+        self.pack_str(buf, name)
+        self.pack_str(buf, calibration.get('led', None))
+        self.pack_str(buf, calibration.get('units', None))
+        self.pack_str(buf, calibration['fit_type'])
+        self.pack_str(buf, calibration.get('gain', None))
+        self.pack_str(buf, calibration.get('integration_time', None))
+        try:
+            range_min = float(calibration['range']['min'])
+            range_max = float(calibration['range']['max'])
+        except KeyError:
+            buf.extend(struct.pack('<B', 0))
+        else:
+            buf.extend(struct.pack('<Bdd', 1, range_min, range_max))
+        fit_coef = calibration.get('fit_coef', None) or []
+        buf.extend(struct.pack('<B', len(fit_coef)))
+        for coef in fit_coef:
+            buf.extend(struct.pack('<d', float(coef)))
+        fit_table = calibration.get('fit_table', None) or []
+        buf.extend(struct.pack('<B', len(fit_table)))
+        for x, y in fit_table:
+            buf.extend(struct.pack('<dd', float(x), float(y)))
+        return bytes(buf)
+
+    def unpack(self, record):
+        # Calibration data, in the json schema, from a packed binary record
+        pos = 0
+        values = []
+        for i in range(6):
+            length = record[pos]
+            pos += 1
+            if length == self.NONE_LENGTH:
+                values.append(None)
+            else:
+                values.append(record[pos:pos+length].decode())
+                pos += length
+        name, led, units, fit_type, gain, itime = values
+        calibration = {'fit_type': fit_type}
+        for key, value in (('led', led), ('units', units), ('gain', gain), ('integration_time', itime)):
+            if value is not None:
+                calibration[key] = value
+        if record[pos]:
+            range_min, range_max = struct.unpack_from('<dd', record, pos+1)
+            calibration['range'] = {'min': range_min, 'max': range_max}
+            pos += 17
+        else:
+            pos += 1
+        num_coef = record[pos]
+        pos += 1
+        if num_coef:
+            calibration['fit_coef'] = list(struct.unpack_from(f'<{num_coef}d', record, pos))
+            pos += 8*num_coef
+        num_points = record[pos]
+        pos += 1
+        if num_points:
+            table = struct.unpack_from(f'<{2*num_points}d', record, pos)
+            calibration['fit_table'] = [(table[2*k], table[2*k+1]) for k in range(num_points)]
+        return calibration
+
+    def pack_str(self, buf, value):
+        # Strings are never truncated, calibrations with strings too long to
+        # pack are rejected by check_strings.
+        if value is None:
+            buf.extend(struct.pack('<B', self.NONE_LENGTH))
+        else:
+            value_bytes = value.encode()
+            if len(value_bytes) >= self.NONE_LENGTH:
+                raise ValueError('string too long to pack')
+            buf.extend(struct.pack('<B', len(value_bytes)))
+            buf.extend(value_bytes)
+
+    def short_str(self, value):
+        # Error text shortened, on a character boundary, so it can be packed
+        value = value[:self.NONE_LENGTH-1]
+        while len(value.encode()) >= self.NONE_LENGTH:
+            value = value[:-1]
+        return value
+
+    def write_str(self, f, value):
+        buf = bytearray()
+        self.pack_str(buf, value)
+        f.write(buf)
+
+    def read_str(self, f):
+        length = f.read(1)[0]
+        if length == self.NONE_LENGTH:
+            return None
+        return f.read(length).decode()
+
+    def check_calibration(self, name, calibration):
+        # Returns list of errors found in calibration
+        if type(calibration) != dict:
+            return [f'{name} calibration must be dict']
+        error_list = []
+        error_list.extend(self.check_strings(name, calibration))
+        error_list.extend(self.check_fit(name, calibration))
+        error_list.extend(self.check_range(name, calibration))
+        error_list.extend(self.check_sensor(name, calibration))
+        return error_list
+
+    def check_strings(self, name, calibration):
+        # Name, led and units must fit in a packed string in the compiled file
+        error_list = []
+        max_len = self.NONE_LENGTH - 1
+        if len(name.encode()) > max_len:
+            error_msg = f'{name} name longer than {max_len} bytes'
+            error_list.append(error_msg)
+        for key in ('led', 'units'):
+            value = calibration.get(key, None)
+            if value is None:
+                continue
+            if type(value) != str:
+                error_msg = f'{name} {key} must be a string'
+                error_list.append(error_msg)
+            elif len(value.encode()) > max_len:
+                error_msg = f'{name} {key} longer than {max_len} bytes'
+                error_list.append(error_msg)
+        return error_list
+
+    def get(self, name):
+        # Compiled calibration, parsed from the file if not in the cache 
+        try:
+            calibration = self.cache.pop(name)
+        except KeyError:
+            calibration = self.read(name)
+            if len(self.cache) >= self.CACHE_SIZE:
+                del self.cache[next(iter(self.cache))]
+        self.cache[name] = calibration
+        return calibration
+
+    def read(self, name):
+        # Compile a calibration from its packed record or json span
+        offset, length, led = self.data[name]
+        if self.is_compiled_index:
+            with open(self.COMPILED_FILE_NAME, 'rb') as f:
+                f.seek(offset)
+                calibration_data = self.unpack(f.read(length))
+        else:
+            with open(self.FILE_NAME, 'rb') as f:
+                f.seek(offset)
+                calibration_data = json.loads(f.read(length).decode())
+        return Calibration(name, calibration_data)
+
+    @property
+    def leds(self):
+        leds = []
+        for offset, length, led in self.data.values():
+            if led is not None and not led in leds:
+                leds.append(led)
+        return leds
+
+    def names_for_led(self, led):
+        return [k for (k, v) in self.data.items() if v[2] == led]
 
     def check_fit(self,name, calibration): 
         error_list = []
@@ -43,6 +476,9 @@ class Calibrations(JsonSettingsFile):
             if not fit_type in self.ALLOWED_FIT_TYPES:
                 error_msg = f'{name} unknown fit_type {fit_type}'
                 error_list.append(error_msg)
+        if fit_type == 'table':
+            error_list.extend(self.check_table(name, calibration))
+            return error_list
         try:
             fit_coef = calibration['fit_coef']
         except KeyError:
@@ -53,13 +489,41 @@ class Calibrations(JsonSettingsFile):
             try:
                 fit_coef = ulab.numpy.array(fit_coef)
             except (ValueError, TypeError):
+                fit_coef = None
                 error_msg = f'{name} fit coeff format incorrect'
                 error_list.append(error_msg)
-        if fit_type == 'linear' and fit_coef.size > 2:
+        if fit_type == 'linear' and fit_coef is not None and fit_coef.size > 2:
             error_msg = f'{name} too many fit_coef for linear fit'
             error_list.append(error_msg)
         return error_list
 
+    def check_table(self, name, calibration):
+        # Table of (absorbance, value) points with absorbance strictly
+        # increasing.
+        error_list = []
+        try:
+            fit_table = calibration['fit_table']
+        except KeyError:
+            error_msg = f'{name} missing fit_table'
+            error_list.append(error_msg)
+            return error_list
+        try:
+            points = [(float(x), float(y)) for (x,y) in fit_table]
+        except (ValueError, TypeError):
+            error_msg = f'{name} fit_table format incorrect'
+            error_list.append(error_msg)
+            return error_list
+        num_points = len(points)
+        if num_points < self.MIN_TABLE_POINTS or num_points > self.MAX_TABLE_POINTS:
+            error_msg = f'{name} fit_table must have {self.MIN_TABLE_POINTS} to {self.MAX_TABLE_POINTS} points'
+            error_list.append(error_msg)
+        for (x0, y0), (x1, y1) in zip(points[:-1], points[1:]):
+            if x1 <= x0:
+                error_msg = f'{name} fit_table absorbance not increasing'
+                error_list.append(error_msg)
+                break
+        return error_list
+
     def check_range(self, name, calibration):
         min_value = None
         max_value = None
@@ -67,9 +531,10 @@ class Calibrations(JsonSettingsFile):
         try:
             range_data = calibration['range']
         except KeyError:
-            if fit_type != 'linear':
+            if calibration.get('fit_type', None) != 'linear':
                 error_msg = f'{name} range data missing'
                 error_list.append(error_msg)
+            return error_list
         else:
             if not type(range_data) == dict:
                 error_msg = f'range_data must be dict'
@@ -99,52 +564,275 @@ class Calibrations(JsonSettingsFile):
                 error_msg = f'{name} range min > max'
                 error_list.append(error_msg)
 
+        # Table calibrations can't extrapolate, range must be inside table
+        if calibration.get('fit_type', None) == 'table':
+            try:
+                table_min = float(calibration['fit_table'][0][0])
+                table_max = float(calibration['fit_table'][-1][0])
+            except (KeyError, IndexError, ValueError, TypeError):
+                pass
+            else:
+                if min_value is not None and min_value < table_min:
+                    error_msg = f'{name} range min < fit_table min'
+                    error_list.append(error_msg)
+                if max_value is not None and max_value > table_max:
+                    error_msg = f'{name} range max > fit_table max'
+                    error_list.append(error_msg)
+
+        return error_list
+
+    def check_sensor(self, name, calibration):
+        # Optional calibration specific gain and integration time
+        error_list = []
+        gain_str = calibration.get('gain', None)
+        if gain_str is not None and not gain_str in constants.STR_TO_GAIN:
+            error_msg = f'{name} unknown gain {gain_str}'
+            error_list.append(error_msg)
+        itime_str = calibration.get('integration_time', None)
+        if itime_str is not None and not itime_str in constants.STR_TO_INTEGRATION_TIME:
+            error_msg = f'{name} unknown integration time {itime_str}'
+            error_list.append(error_msg)
         return error_list
 
+    def add(self, name, calibration):
+        # Check new calibration and append it to the calibrations file. The
+        # closing brace is overwritten so the rest of the file is untouched.
+        error_list = self.check_calibration(name, calibration)
+        if error_list:
+            raise CalibrationsError(error_list[0])
+        entry = json.dumps(calibration).encode()
+        if self.end_offset is None and self.FILE_NAME in os.listdir():
+            # File exists but couldn't be loaded, don't overwrite it
+            error_msg = f'{self.FILE_TYPE} file not loaded, unable to add'
+            raise CalibrationsError(error_msg)
+        try:
+            if self.end_offset is None:
+                with open(self.FILE_NAME, 'wb') as f:
+                    f.write(b'{')
+                    f.write(json.dumps(name).encode())
+                    f.write(b': ')
+                    offset = f.tell()
+                    f.write(entry)
+                    f.write(b'}')
+                    self.end_offset = f.tell() - 1
+            else:
+                with open(self.FILE_NAME, 'r+b') as f:
+                    f.seek(self.end_offset)
+                    if self.has_members:
+                        f.write(b', ')
+                    f.write(json.dumps(name).encode())
+                    f.write(b': ')
+                    offset = f.tell()
+                    f.write(entry)
+                    f.write(b'}')
+                    self.end_offset = f.tell() - 1
+            self.has_members = True
+        except OSError:
+            error_msg = f'unable to write {self.FILE_TYPE} file'
+            raise CalibrationsError(error_msg)
+        if self.is_compiled_index:
+            # Rebuild the compiled file, errors already reported are kept off
+            error_dict = self.error_dict
+            self.load()
+            self.error_dict = error_dict
+        else:
+            index = list(self.data.items())
+            index.append((name, (offset, len(entry), calibration.get('led', None))))
+            index.sort()
+            self.add_units(calibration.get('units', None))
+            self.data = OrderedDict(index)
+            self.group_cache = None
+            self.stat = self.file_stat()
+            gc.collect()
+
+    def new_name(self, prefix):
+        # Unused calibration name with the given prefix
+        num = 1
+        while f'{prefix} {num}' in self.data:
+            num += 1
+        return f'{prefix} {num}'
+
     def led(self, name):
         try:
-            led = self.data[name]['led']
+            led = self.data[name][2]
         except KeyError:
             led = None
         return led
 
     def units(self, name):
         try:
-            units = self.data[name]['units']
+            units = self.get(name).units
         except KeyError:
             units = None
         return units
 
+    def gain(self, name):
+        try:
+            gain = self.get(name).gain
+        except KeyError:
+            gain = None
+        return gain
+
+    def integration_time(self, name):
+        try:
+            itime = self.get(name).integration_time
+        except KeyError:
+            itime = None
+        return itime
+
     def apply(self, name, absorbance):
-        fit_type = self.data[name]['fit_type']
-        fit_coef = ulab.numpy.array(self.data[name]['fit_coef'])
+        return self.get(name).apply(absorbance)
 
-        if fit_type in ('linear', 'polynomial'):
-            # Get range min and max for checking if absorbance within range
-            try:
-                range_min = self.data[name]['range']['min']
-                range_max = self.data[name]['range']['max']
-            except KeyError:
-                range_min = None
-                range_max = None
-
-            # Check to see if absorbance is within acceptable range
-            is_inside_range = True 
-            if range_min is not None:
-                is_inside_range &= absorbance >= range_min
-            if range_max is not None:
-                is_inside_range &= absorbance <= range_max
-
-            # Apply calibration if within range
-            if is_inside_range:
-                value = ulab.numpy.polyval(fit_coef, [absorbance])[0]
+    def group(self, led):
+        # Only the most recently used group is kept compiled
+        if self.group_cache is None or self.group_cache[0] != led:
+            self.group_cache = None
+            gc.collect()
+            names = self.names_for_led(led)
+            if not names:
+                raise KeyError(led)
+            calibration_list = [self.read(name) for name in names]
+            self.group_cache = (led, CalibrationGroup(calibration_list))
+        return self.group_cache[1]
+
+    def apply_all(self, led, absorbance):
+        # Apply every calibration for the given led to one absorbance 
+        return self.group(led).apply(absorbance)
+
+
+class Calibration:
+
+    # Calibration compiled from its json data. Coefficients are stored as 
+    # floats, highest order first, for Horner evaluation so that apply does
+    # not allocate. Table calibrations store the points and the slope of 
+    # each segment for interpolation.
+
+    __slots__ = (
+            'name', 
+            'units', 
+            'led', 
+            'fit_type', 
+            'fit_coef', 
+            'table_x', 
+            'table_y', 
+            'table_slope', 
+            'range_min', 
+            'range_max', 
+            'gain', 
+            'integration_time',
+            )
+
+    def __init__(self, name, data):
+        self.name = name
+        self.units = data.get('units', None)
+        self.led = data.get('led', None)
+        self.fit_type = data['fit_type']
+        if self.fit_type == 'table':
+            self.fit_coef = ()
+            self.table_x = tuple([float(x) for (x,y) in data['fit_table']])
+            self.table_y = tuple([float(y) for (x,y) in data['fit_table']])
+            self.table_slope = tuple([
+                (y1 - y0)/(x1 - x0) for (x0, x1, y0, y1) in zip(
+                    self.table_x[:-1], self.table_x[1:], 
+                    self.table_y[:-1], self.table_y[1:],
+                    )
+                ])
+        else:
+            self.fit_coef = tuple([float(c) for c in data['fit_coef']])
+            self.table_x = None
+            self.table_y = None
+            self.table_slope = None
+        try:
+            self.range_min = float(data['range']['min'])
+            self.range_max = float(data['range']['max'])
+        except KeyError:
+            self.range_min = None
+            self.range_max = None
+        try:
+            self.gain = constants.STR_TO_GAIN[data['gain']]
+        except KeyError:
+            self.gain = None
+        try:
+            self.integration_time = constants.STR_TO_INTEGRATION_TIME[data['integration_time']]
+        except KeyError:
+            self.integration_time = None
+
+    def is_inside_range(self, absorbance):
+        if self.range_min is not None and absorbance < self.range_min:
+            return False
+        if self.range_max is not None and absorbance > self.range_max:
+            return False
+        return True
+
+    def find_segment(self, absorbance):
+        # Binary search for table segment containing absorbance
+        lo = 0
+        hi = len(self.table_slope) - 1
+        while lo < hi:
+            mid = (lo + hi + 1)//2
+            if self.table_x[mid] <= absorbance:
+                lo = mid
             else:
-                value = None
+                hi = mid - 1
+        return lo
+
+    def apply(self, absorbance):
+        if self.fit_type in ('linear', 'polynomial'):
+            if not self.is_inside_range(absorbance):
+                return None
+            value = 0.0
+            for coef in self.fit_coef:
+                value = value*absorbance + coef
+        elif self.fit_type == 'table':
+            if not self.is_inside_range(absorbance):
+                return None
+            i = self.find_segment(absorbance)
+            value = self.table_y[i] + self.table_slope[i]*(absorbance - self.table_x[i])
         else:
             # We shouldn't be here ... unknown fit type
-            error_msg = f'{fit_type} fit type not implemented'
+            error_msg = f'{self.fit_type} fit type not implemented'
             raise CalibrationsError(error_msg)
-
         return value
 
 
+class CalibrationGroup:
+
+    # Calibrations sharing an led evaluated together. Polynomials use a
+    # vectorized Horner scheme with coefficients stored as columns, highest
+    # order first, zero padded to a common order. Tables are evaluated 
+    # individually.
+
+    def __init__(self, calibration_list):
+        self.calibrations = calibration_list
+        self.names = [c.name for c in calibration_list]
+        self.units = [c.units for c in calibration_list]
+        num_coef = max([len(c.fit_coef) for c in calibration_list] + [1])
+        self.coef_columns = []
+        for j in range(num_coef):
+            column = []
+            for c in calibration_list:
+                k = j - (num_coef - len(c.fit_coef))
+                column.append(c.fit_coef[k] if k >= 0 else 0.0)
+            self.coef_columns.append(ulab.numpy.array(column))
+        self.values = ulab.numpy.zeros((len(calibration_list),))
+        self.results = [None]*len(calibration_list)
+
+    def __len__(self):
+        return len(self.calibrations)
+
+    def apply(self, absorbance):
+        # Returns list of values, None for out of range. The list is reused
+        # between calls.
+        self.values *= 0.0
+        for column in self.coef_columns:
+            self.values *= absorbance
+            self.values += column
+        for i, calibration in enumerate(self.calibrations):
+            if calibration.fit_type == 'table':
+                self.results[i] = calibration.apply(absorbance)
+            elif calibration.is_inside_range(absorbance):
+                self.results[i] = float(self.values[i])
+            else:
+                self.results[i] = None
+        return self.results
+
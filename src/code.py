@@ -1,13 +1,24 @@
 import sys
+import supervisor
 sys.path.append('src')
+
+# Boot profile is started first so it covers showing the splash screen
+from boot_profile import BootProfile
+boot_profile = BootProfile()
+
+# Settings files are reloaded by the colorimeter when changed, so writes to
+# the filesystem shouldn't restart the program.
+supervisor.disable_autoreload()
 from splash_screen import SplashScreen
 
 # Show splash screen and display while other stuff loads
 splash_screen = SplashScreen()
 splash_screen.show()
+boot_profile.stage('splash')
 
 # Import and start colorimeter
 from colorimeter import Colorimeter 
-colorimeter = Colorimeter()
+boot_profile.stage('import')
+colorimeter = Colorimeter(boot_profile)
 colorimeter.run()
 
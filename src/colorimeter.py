@@ -4,14 +4,22 @@ import board
 import analogio
 import digitalio
 import gamepadshift
+import fonts
 import constants
 import adafruit_itertools
 
 from light_sensor import LightSensor
 from light_sensor import LightSensorOverflow
 from light_sensor import LightSensorIOError
+from auto_range import AutoRange
+from gain_ratio_meter import GainRatioMeter
+from oversampler import Oversampler
+from noise_target import NoiseTarget
 
 from battery_monitor import BatteryMonitor
+from ring_buffer import RingBuffer
+from blank_cache import BlankCache
+from boot_profile import BootProfile
 
 from configuration import Configuration
 from configuration import ConfigurationError
@@ -22,39 +30,73 @@ from calibrations import CalibrationsError
 from menu_screen import MenuScreen
 from message_screen import MessageScreen
 from measure_screen import MeasureScreen
+from multi_measure_screen import MultiMeasureScreen
+from screen_manager import ScreenManager
+from menu_model import MenuModel
 
 class Mode:
-    MEASURE = 0
-    MENU    = 1
-    MESSAGE = 2
-    ABORT   = 3
+    MEASURE   = 0
+    MENU      = 1
+    MESSAGE   = 2
+    ABORT     = 3
+    CALIBRATE = 4
+    PLOT      = 5
 
 class Colorimeter:
 
     ABOUT_STR = 'About'
     RAW_SENSOR_STR = 'Raw Sensor' 
+    MULTI_STR = 'All'
+    CALIBRATE_STR = 'New Calibration'
+    PLOT_STR = 'Plot'
+    CUSTOM_CALIBRATION_PREFIX = 'Custom'
     ABSORBANCE_STR = 'Absorbance'
     TRANSMITTANCE_STR = 'Transmittance'
     DEFAULT_MEASUREMENTS = [ABSORBANCE_STR, TRANSMITTANCE_STR, RAW_SENSOR_STR]
 
-    def __init__(self):
+    def __init__(self, boot_profile=None):
 
-        self.menu_items = list(self.DEFAULT_MEASUREMENTS)
-        self.menu_view_pos = 0
-        self.menu_item_pos = 0
+        if boot_profile is None:
+            boot_profile = BootProfile()
+        self.boot_profile = boot_profile
+        self.menu_items = []
+        self.measurement_items = []
+        self.multi_items = {}
+        self.menu = MenuModel()
+        self.recent_items = []
+        self.multi_view_pos = 0
         self.mode = Mode.MEASURE
         self.is_blanked = False
-        self.blank_value = 1.0
-
+        self.blank_cache = BlankCache()
+        self.preliminary_blank_value = 1.0
+        self.is_preliminary_blank_pending = False
+        self.sample = None
+        self.calibration_builder = None
+        self.calibration_coef = None
+        self.calibrate_concentration = 0.0
+        self.calibrate_status = ''
+        self.calibrate_step_cycle = adafruit_itertools.cycle(constants.CALIBRATE_STEPS)
+        self.calibrate_step = next(self.calibrate_step_cycle)
 
         # Create screens
         board.DISPLAY.brightness = 1.0
-        self.measure_screen = MeasureScreen()
-        self.message_screen = MessageScreen()
-        self.menu_screen = MenuScreen()
+        self.screen_manager = ScreenManager()
+        self.screen_manager.register('measure', MeasureScreen)
+        self.screen_manager.register('multi_measure', MultiMeasureScreen)
+        self.screen_manager.register('menu', MenuScreen)
+        self.screen_manager.register('message', MessageScreen, releasable=True)
+        self.screen_manager.register('calibrate', self.create_calibrate_screen, releasable=True)
+        self.screen_manager.register('plot', self.create_plot_screen, releasable=True)
+
+        # Screens refresh the display themselves, only when they change
+        board.DISPLAY.auto_refresh = False
 
         # Setup gamepad inputs - change this (Keypad shift??)
         self.last_button_press = time.monotonic()
+        self.held_buttons = 0
+        self.repeat_count = 0
+        self.repeat_step = 1
+        self.next_repeat_time = 0.0
         self.pad = gamepadshift.GamePadShift(
                 digitalio.DigitalInOut(board.BUTTON_CLOCK), 
                 digitalio.DigitalInOut(board.BUTTON_OUT),
@@ -70,6 +112,7 @@ class Colorimeter:
             self.message_screen.set_message(error)
             self.message_screen.set_to_error()
             self.mode = Mode.MESSAGE
+        self.boot_profile.stage('config')
 
         # Load calibrations and populate menu items
         self.calibrations = Calibrations()
@@ -87,12 +130,13 @@ class Colorimeter:
                 self.message_screen.set_message(error_msg)
                 self.message_screen.set_to_error()
                 self.mode = Mode.MESSAGE
+        self.boot_profile.stage('calib')
 
-        self.menu_items.extend([k for k in self.calibrations.data])
-        self.menu_items.append(self.ABOUT_STR)
+        self.setup_menu_items()
+        self.boot_profile.stage('menu')
 
         # Set default/startup measurement
-        if self.configuration.startup in self.menu_items:
+        if self.configuration.startup in self.measurement_items:
             self.measurement_name = self.configuration.startup
         else:
             if self.configuration.startup is not None:
@@ -101,8 +145,21 @@ class Colorimeter:
                 self.message_screen.set_to_error()
                 self.mode = Mode.MESSAGE
             self.measurement_name = self.menu_items[0] 
+        self.check_favorites()
+
+        # Buffer for windowed average and standard deviation of measurement
+        self.measurement_buffer = RingBuffer(self.configuration.averaging_window)
+        self.blank_buffer = RingBuffer(constants.NUM_BLANK_SAMPLES)
+        self.standard_buffer = RingBuffer(constants.NUM_STANDARD_SAMPLES)
+
+        # Load blanks saved to flash
+        if self.configuration.save_blanks:
+            self.blank_cache.load()
+            self.is_blanked = not self.blank_cache.is_empty
 
-        # Setup light sensor and preliminary blanking 
+        # Setup light sensor. The preliminary blank, used until the user 
+        # blanks, takes a few seconds so it is deferred until after the first 
+        # frame has been shown, see run().
         try:
             self.light_sensor = LightSensor()
         except LightSensorIOError as error:
@@ -111,59 +168,229 @@ class Colorimeter:
             self.message_screen.set_to_abort()
             self.mode = Mode.ABORT
         else:
-            if self.configuration.gain is not None:
-                self.light_sensor.gain = self.configuration.gain
-            if self.configuration.integration_time is not None:
-                self.light_sensor.integration_time = self.configuration.integration_time
-            self.blank_sensor(set_blanked=False)
-            self.measure_screen.set_not_blanked()
+            self.setup_sampling()
+            try:
+                self.set_sensor_settings()
+                self.is_preliminary_blank_pending = not self.is_blanked
+            except LightSensorIOError as error:
+                self.message_screen.set_message(error)
+                self.message_screen.set_to_error()
+                self.mode = Mode.MESSAGE
+            if not self.is_blanked:
+                self.measure_screen.set_not_blanked()
 
-        # Setup up battery monitoring settings cycles 
+        # Setup up battery monitoring
         self.battery_monitor = BatteryMonitor()
-        self.setup_gain_and_itime_cycles()
+        self.last_reload_check = time.monotonic()
+        self.boot_profile.stage('sensor')
 
-    def setup_gain_and_itime_cycles(self):
-        self.gain_cycle = adafruit_itertools.cycle(constants.GAIN_TO_STR) 
-        if self.configuration.gain is not None:
-            while next(self.gain_cycle) != self.configuration.gain: 
-                continue
+    def setup_menu_items(self):
+        self.measurement_items = list(self.DEFAULT_MEASUREMENTS)
+        self.measurement_items.extend([k for k in self.calibrations.data])
 
-        self.itime_cycle = adafruit_itertools.cycle(constants.INTEGRATION_TIME_TO_STR)
-        if self.configuration.integration_time is not None:
-            while next(self.itime_cycle) != self.configuration.integration_time:
-                continue
+        # Add items for viewing all calibrations for an led at once
+        self.multi_items = {}
+        for led in self.calibrations.leds:
+            if len(self.calibrations.names_for_led(led)) > 1:
+                self.multi_items[f'{self.MULTI_STR} {led}'] = led
+        self.measurement_items.extend(self.multi_items)
 
-    @property
-    def num_menu_items(self):
-        return len(self.menu_items)
-
-    def incr_menu_item_pos(self):
-        if self.menu_item_pos < self.num_menu_items-1:
-            self.menu_item_pos += 1
-        diff_pos = self.menu_item_pos - self.menu_view_pos
-        if diff_pos > self.menu_screen.items_per_screen-1:
-            self.menu_view_pos += 1
-
-    def decr_menu_item_pos(self):
-        if self.menu_item_pos > 0:
-            self.menu_item_pos -= 1
-        if self.menu_item_pos < self.menu_view_pos:
-            self.menu_view_pos -= 1
+        # Menu has the measurements followed by the other actions
+        self.menu_items = list(self.measurement_items)
+        self.menu_items.append(self.PLOT_STR)
+        self.menu_items.append(self.CALIBRATE_STR)
+        self.menu_items.append(self.ABOUT_STR)
 
-    def update_menu_screen(self):
-        n0 = self.menu_view_pos
-        n1 = n0 + self.menu_screen.items_per_screen
-        view_items = []
-        for i, item in enumerate(self.menu_items[n0:n1]):
+        # Display strings are computed once here rather than on every update
+        self.menu_texts = []
+        for i, item in enumerate(self.menu_items):
             led = self.calibrations.led(item)
             if led is None:
-                item_text = f'{n0+i} {item}' 
+                self.menu_texts.append(f'{i} {item}')
             else:
-                item_text = f'{n0+i} {item} ({led})' 
-            view_items.append(item_text)
-        self.menu_screen.set_menu_items(view_items)
-        pos = self.menu_item_pos - self.menu_view_pos
-        self.menu_screen.set_curr_item(pos)
+                self.menu_texts.append(f'{i} {item} ({led})')
+        self.update_menu_model()
+        self.preload_glyphs()
+
+    def preload_glyphs(self):
+        # Load all glyphs the screens are likely to need, including those of
+        # the calibration units shown with values, in one pass rather than
+        # one at a time on first use, and save them to the glyph caches so
+        # later boots don't need to parse the pcf fonts at all.
+        fonts.preload(
+                constants.PRELOAD_GLYPHS 
+                + ''.join(self.menu_texts) 
+                + ''.join(self.calibrations.all_units)
+                )
+        fonts.save_caches()
+
+    @property
+    def quick_items(self):
+        # Favorites followed by the recently used measurements
+        items = [k for k in self.configuration.favorites if k in self.measurement_items]
+        for item in self.recent_items:
+            if not item in items and item in self.measurement_items:
+                items.append(item)
+        return items
+
+    def update_menu_model(self):
+        # Quick access items are shown at the top of the menu, marked with
+        # '*' for favorites and '>' for recently used.
+        quick_items = self.quick_items
+        quick_texts = []
+        for item in quick_items:
+            mark = '*' if item in self.configuration.favorites else '>'
+            quick_texts.append(f'{mark} {item}')
+        self.menu.set_items(quick_items + self.menu_items, quick_texts + self.menu_texts)
+
+    def check_favorites(self):
+        # Favorites can only be checked once the calibrations are loaded. 
+        # Unknown names are left out of the quick items and reported, unless
+        # another message is already being shown.
+        if not self.configuration.check_favorites(self.measurement_items):
+            return
+        if self.mode in (Mode.MESSAGE, Mode.ABORT):
+            return
+        self.message_screen.set_message(self.configuration.error_dict['favorites'])
+        self.message_screen.set_to_error()
+        self.mode = Mode.MESSAGE
+
+    def cycle_quick_items(self, step):
+        # Switch measurement directly to the next/previous quick access item.
+        # The recently used list isn't reordered so repeated presses cycle.
+        items = self.quick_items
+        if not items:
+            return
+        try:
+            pos = (items.index(self.measurement_name) + step) % len(items)
+        except ValueError:
+            pos = 0 if step > 0 else len(items) - 1
+        self.select_measurement(items[pos], update_recent=False)
+
+    def setup_sampling(self):
+        # Sensor range and sample processing set from the configuration
+        self.auto_range = AutoRange(
+                self.light_sensor, 
+                GainRatioMeter(self.blank_cache),
+                )
+        self.oversampler = Oversampler(self.configuration.oversample)
+        self.noise_target = NoiseTarget(
+                self.light_sensor, 
+                self.oversampler, 
+                self.configuration.target_precision,
+                Configuration.MAX_OVERSAMPLE,
+                )
+
+    def check_for_reload(self):
+        # Reload configuration and calibrations files if they have been 
+        # changed, e.g. edited over usb. Only checked at a low rate as it
+        # requires a stat of each file.
+        t = time.monotonic()
+        if t - self.last_reload_check < constants.RELOAD_CHECK_DT:
+            return
+        self.last_reload_check = t
+        if self.configuration.has_changed:
+            self.reload_configuration()
+        if self.calibrations.has_changed:
+            self.reload_calibrations()
+
+    def reload_configuration(self):
+        # New configuration is only swapped in if it loads. Blanks are kept
+        # as they are normalized by gain and integration time.
+        configuration = Configuration()
+        try:
+            configuration.load()
+        except ConfigurationError as error:
+            # Don't retry until the file changes again
+            self.configuration.stat = configuration.stat
+            self.message_screen.set_message(error)
+            self.message_screen.set_to_error()
+            self.mode = Mode.MESSAGE
+            return
+        self.configuration = configuration
+        if self.measurement_buffer.size != configuration.averaging_window:
+            self.measurement_buffer = RingBuffer(configuration.averaging_window)
+        else:
+            self.measurement_buffer.clear()
+        self.setup_sampling()
+        self.set_sensor_settings()
+        self.update_menu_model()
+        self.check_favorites()
+
+    def reload_calibrations(self):
+        # New calibrations are only swapped in if the file loads. The current 
+        # measurement is kept if it is still in the menu.
+        calibrations = Calibrations()
+        try:
+            calibrations.load()
+        except CalibrationsError as error:
+            # Don't retry until the file changes again
+            self.calibrations.stat = calibrations.stat
+            self.message_screen.set_message(error)
+            self.message_screen.set_to_error()
+            self.mode = Mode.MESSAGE
+            return
+        self.calibrations = calibrations
+        self.setup_menu_items()
+        if not self.measurement_name in self.DEFAULT_MEASUREMENTS:
+            if self.measurement_name in self.measurement_items:
+                self.select_measurement(self.measurement_name)
+            else:
+                self.select_measurement(self.measurement_items[0])
+        if self.mode == Mode.MENU:
+            self.update_menu_screen()
+        if self.calibrations.has_errors:
+            error_msg = f'errors found in calibrations file'
+            self.message_screen.set_message(error_msg)
+            self.message_screen.set_to_error()
+            self.mode = Mode.MESSAGE
+        self.check_favorites()
+
+    def select_measurement(self, name, update_recent=True):
+        self.measurement_name = name
+        self.measurement_buffer.clear()
+        self.multi_view_pos = 0
+        self.set_sensor_settings()
+        if update_recent and name in self.measurement_items:
+            if name in self.recent_items:
+                self.recent_items.remove(name)
+            self.recent_items.insert(0, name)
+            del self.recent_items[constants.NUM_RECENT_ITEMS:]
+            self.update_menu_model()
+
+    def next_setting(self, settings, current):
+        # Setting after the current one, wrapping around. Buttons step on from
+        # the sensor's current value rather than keeping their own position,
+        # as the configuration, calibrations, auto range and noise target all
+        # change the sensor settings too.
+        settings = list(settings)
+        try:
+            index = settings.index(current)
+        except ValueError:
+            index = -1
+        return settings[(index + 1) % len(settings)]
+
+    def set_sensor_settings(self):
+        # Use the gain and integration time of the current calibration when
+        # given, otherwise use the values from the configuration.
+        gain = self.calibrations.gain(self.measurement_name)
+        if gain is None:
+            gain = self.configuration.gain
+        if gain is not None:
+            self.light_sensor.gain = gain
+        itime = self.calibrations.integration_time(self.measurement_name)
+        if itime is None:
+            itime = self.configuration.integration_time
+        if itime is not None:
+            self.light_sensor.integration_time = itime
+        if self.noise_target.is_enabled:
+            # Integration time is set by noise target, auto range gain only
+            self.auto_range.set_integration_times([self.light_sensor.integration_time])
+
+    def update_menu_screen(self):
+        self.menu.set_items_per_screen(self.menu_screen.items_per_screen)
+        self.menu_screen.set_menu_items(self.menu.view_texts)
+        self.menu_screen.set_curr_item(self.menu.cursor)
 
     @property
     def is_absorbance(self):
@@ -177,6 +404,57 @@ class Colorimeter:
     def is_raw_sensor(self):
         return self.measurement_name == self.RAW_SENSOR_STR
 
+    @property
+    def is_multi_analyte(self):
+        return self.measurement_name in self.multi_items
+
+    # Note, screens are constructed by the screen manager on first use
+
+    @property
+    def measure_screen(self):
+        return self.screen_manager.get('measure')
+
+    @property
+    def multi_measure_screen(self):
+        return self.screen_manager.get('multi_measure')
+
+    @property
+    def menu_screen(self):
+        return self.screen_manager.get('menu')
+
+    @property
+    def message_screen(self):
+        return self.screen_manager.get('message')
+
+    def create_calibrate_screen(self):
+        # Rarely used screens are imported on first use to save boot time 
+        # and memory
+        from calibrate_screen import CalibrateScreen
+        return CalibrateScreen()
+
+    def create_plot_screen(self):
+        from plot_screen import PlotScreen
+        return PlotScreen()
+
+    @property
+    def calibrate_screen(self):
+        return self.screen_manager.get('calibrate')
+
+    @property
+    def plot_screen(self):
+        return self.screen_manager.get('plot')
+
+    @property
+    def active_measure_screen(self):
+        if self.is_multi_analyte:
+            return self.multi_measure_screen
+        else:
+            return self.measure_screen
+
+    @property
+    def is_averaging(self):
+        return self.measurement_buffer.size > 1
+
     @property
     def measurement_units(self):
         if self.measurement_name in self.DEFAULT_MEASUREMENTS: 
@@ -185,13 +463,89 @@ class Colorimeter:
             units = self.calibrations.units(self.measurement_name)
         return units
 
+    def update_sensor(self):
+        # Non-blocking acquisition. Starts an integration when the sensor is
+        # idle and collects the result once it is valid. Returns True when a
+        # new reading is available. 
+        if not self.light_sensor.is_busy:
+            self.light_sensor.start()
+            return False
+        if not self.light_sensor.poll():
+            return False
+        sample = self.light_sensor.collect()
+        if self.is_raw_sensor:
+            self.sample = sample
+            return True
+        if self.configuration.auto_range:
+            if self.auto_range.update(sample):
+                # Settings changed - discard reading taken with old settings
+                self.oversampler.clear()
+                return False
+        if self.noise_target.is_enabled:
+            if self.noise_target.update(sample):
+                itime = self.light_sensor.integration_time
+                self.auto_range.set_integration_times([itime])
+                self.oversampler.clear()
+                return False
+        if self.oversampler.is_enabled:
+            # Sum short integrations for extended range. An overflow is passed
+            # on immediately.
+            if sample.is_overflow:
+                self.oversampler.clear()
+            elif self.oversampler.add(sample):
+                sample = self.oversampler.pop()
+            else:
+                return False
+        self.sample = sample
+        return True
+
+    def read_sensor(self):
+        # Blocking read, waits for a new reading
+        while not self.update_sensor():
+            time.sleep(self.light_sensor.POLL_DT)
+
+    # Note, all measurement values below are computed from the current
+    # sample so that the values displayed on a frame are consistent. 
+
     @property
     def raw_sensor_value(self):
-        return self.light_sensor.value
+        if self.sample.is_overflow:
+            raise LightSensorOverflow('light sensor reading > max_counts')
+        return self.sample.counts
+
+    @property
+    def raw_ir_sensor_value(self):
+        return self.sample.ir_counts
+
+    @property
+    def normalized_sensor_value(self):
+        # Sensor value scaled by gain and integration time so that the blank
+        # remains valid when these settings change.
+        return self.sample.normalize(self.raw_sensor_value)
+
+    @property
+    def blank_value(self):
+        # Blank usable with the current sample's settings, see BlankCache.
+        # Otherwise the preliminary blank and the reading is shown as not
+        # blanked.
+        value = self.blank_cache.get(self.sample.gain, self.sample.integration_time)
+        if value is None:
+            value = self.preliminary_blank_value
+        return value
+
+    @property
+    def is_sample_blanked(self):
+        # False if there is no blank for the current sample's gain, e.g. after
+        # a gain change whose gain ratio hasn't been measured
+        if self.sample is None:
+            return self.is_blanked
+        gain = self.sample.gain
+        itime = self.sample.integration_time
+        return self.blank_cache.get(gain, itime) is not None
 
     @property
     def transmittance(self):
-        transmittance = float(self.raw_sensor_value)/self.blank_value
+        transmittance = self.normalized_sensor_value/self.blank_value
         return transmittance
 
     @property
@@ -215,24 +569,121 @@ class Colorimeter:
                         self.absorbance
                         )
             except CalibrationsError as error:
-                self.message_screen.set_message(error_message)
+                self.message_screen.set_message(error)
                 self.message_screen.set_to_error()
                 self.measurement_name = 'Absorbance'
                 self.mode = Mode.MESSAGE
+                value = None
         return value
 
-    def blank_sensor(self, set_blanked=True):
-        blank_samples = ulab.numpy.zeros((constants.NUM_BLANK_SAMPLES,))
+    def update_measurement_screen(self):
+        # Send the measurement for the current sample to the measure screen.
+        # When averaging, the windowed mean is displayed.
+        if self.is_multi_analyte:
+            self.update_multi_measure_screen()
+            return
+        try:
+            value = self.measurement_value
+        except LightSensorOverflow:
+            self.measurement_buffer.clear()
+            self.measure_screen.set_overflow(self.measurement_name)
+            return
+        if value is None:
+            self.measurement_buffer.clear()
+        elif self.is_averaging:
+            self.measurement_buffer.append(value)
+            value = self.measurement_buffer.mean
+            if self.is_raw_sensor:
+                value = int(round(value))
+        self.measure_screen.set_measurement(
+                self.measurement_name, 
+                self.measurement_units, 
+                value,
+                self.configuration.precision
+                )
+
+    def update_multi_measure_screen(self):
+        # Evaluate all calibrations for the led in one pass on the absorbance
+        # (windowed mean when averaging) of the current sample. 
+        try:
+            absorbance = self.absorbance
+        except LightSensorOverflow:
+            self.measurement_buffer.clear()
+            self.multi_measure_screen.set_overflow(self.measurement_name)
+            return
+        if self.is_averaging:
+            self.measurement_buffer.append(absorbance)
+            absorbance = self.measurement_buffer.mean
+        group = self.calibrations.group(self.multi_items[self.measurement_name])
+        values = group.apply(absorbance)
+        n0 = self.multi_view_pos
+        n1 = n0 + self.multi_measure_screen.items_per_screen
+        self.multi_measure_screen.set_values(
+                self.measurement_name,
+                group.names[n0:n1],
+                values[n0:n1],
+                group.units[n0:n1],
+                self.configuration.precision
+                )
+
+    def scroll_multi_view(self, step):
+        group = self.calibrations.group(self.multi_items[self.measurement_name])
+        max_pos = max(len(group) - self.multi_measure_screen.items_per_screen, 0)
+        self.multi_view_pos = min(max(self.multi_view_pos + step, 0), max_pos)
+
+    def blank_sensor(self, set_blanked=True, show_progress=True):
+        # Median of blank samples. In adaptive mode sampling stops early once
+        # the median has converged to within the tolerance or when the time
+        # budget is used up. 
+        is_adaptive = self.configuration.blank_mode == 'adaptive'
+        tolerance = self.configuration.blank_tolerance
+        time_budget = self.configuration.blank_time_budget
+        self.blank_buffer.clear()
+        t_start = time.monotonic()
         for i in range(constants.NUM_BLANK_SAMPLES):
+            self.read_sensor()
             try:
-                value = self.raw_sensor_value
+                value = self.normalized_sensor_value
             except LightSensorOverflow:
-                value = self.light_sensor.max_counts
-            blank_samples[i] = value
+                value = self.sample.normalize(self.sample.max_counts)
+            self.blank_buffer.append(value)
+            progress = (i+1)/constants.NUM_BLANK_SAMPLES
+            if is_adaptive:
+                elapsed = time.monotonic() - t_start
+                progress = max(progress, elapsed/time_budget)
+                if elapsed >= time_budget or self.is_blank_converged(tolerance):
+                    break
+            if show_progress:
+                self.active_measure_screen.set_blanking(progress)
+                self.active_measure_screen.show()
             time.sleep(constants.BLANK_DT)
-        self.blank_value = ulab.numpy.median(blank_samples)
+        blank_value = self.blank_buffer.median
+        self.measurement_buffer.clear()
         if set_blanked:
+            self.blank_cache.set(
+                    self.sample.gain, 
+                    self.sample.integration_time, 
+                    blank_value
+                    )
+            if self.configuration.save_blanks:
+                self.blank_cache.save()
             self.is_blanked = True
+        else:
+            self.preliminary_blank_value = blank_value
+
+    def is_blank_converged(self, tolerance):
+        # Checks the standard error of the median, estimated from the median
+        # absolute deviation, relative to the median against the tolerance. 
+        num = len(self.blank_buffer)
+        if num < constants.MIN_BLANK_SAMPLES:
+            return False
+        values = self.blank_buffer.values
+        median = self.blank_buffer.median
+        if median <= 0.0:
+            return False
+        mad = float(ulab.numpy.median(abs(values - median)))
+        median_std_err = 1.2533*1.4826*mad/num**0.5
+        return median_std_err/median <= tolerance
 
     def blank_button_pressed(self, buttons):  
         if self.is_raw_sensor:
@@ -264,56 +715,159 @@ class Colorimeter:
         else:
             return False
 
+    def is_repeatable(self, buttons):
+        # Buttons which repeat when held down
+        up_down = buttons & (constants.BUTTON['up'] | constants.BUTTON['down'])
+        if self.mode == Mode.MENU:
+            page = buttons & (constants.BUTTON['gain'] | constants.BUTTON['itime'])
+            return bool(up_down or page)
+        elif self.mode == Mode.MEASURE:
+            return bool(self.is_multi_analyte and up_down)
+        elif self.mode == Mode.CALIBRATE:
+            return bool(self.calibration_coef is None and up_down)
+        return False
+
     def handle_button_press(self):
         buttons = self.pad.get_pressed()
         if not buttons:
             # No buttons pressed
+            self.held_buttons = 0
             return 
-        if not self.check_debounce():
-            # Still within debounce timeout
-            return  
+
+        t = time.monotonic()
+        if buttons == self.held_buttons:
+            # Buttons held down. Repeat, with the repeat rate and step size
+            # increasing the longer they are held.
+            if not self.is_repeatable(buttons) or t < self.next_repeat_time:
+                return
+            self.repeat_count += 1
+            repeat_dt = constants.REPEAT_DT*constants.REPEAT_ACCEL**self.repeat_count
+            self.next_repeat_time = t + max(repeat_dt, constants.LOOP_DT)
+            self.repeat_step = 1 + self.repeat_count//constants.REPEAT_STEP_COUNT
+        else:
+            if not self.check_debounce():
+                # Still within debounce timeout
+                return  
+            self.held_buttons = buttons
+            self.repeat_count = 0
+            self.repeat_step = 1
+            self.next_repeat_time = t + constants.REPEAT_DELAY_DT
 
         # Get time of last button press for debounce check
-        self.last_button_press = time.monotonic()
+        self.last_button_press = t
 
         # Update state of system based on buttons pressed.
         # This is different for each operating mode. 
         if self.mode == Mode.MEASURE:
             if self.blank_button_pressed(buttons):
-                self.measure_screen.set_blanking()
+                self.active_measure_screen.set_blanking()
                 self.blank_sensor()
             elif self.menu_button_pressed(buttons):
                 self.mode = Mode.MENU
-                self.menu_view_pos = 0
-                self.menu_item_pos = 0
+                self.menu.reset()
                 self.update_menu_screen()
             elif self.gain_button_pressed(buttons):
-                self.light_sensor.gain = next(self.gain_cycle)
-                self.is_blanked = False
+                self.light_sensor.gain = self.next_setting(
+                        constants.GAIN_TO_STR, 
+                        self.light_sensor.gain,
+                        )
+                self.measurement_buffer.clear()
             elif self.itime_button_pressed(buttons):
-                self.light_sensor.integration_time = next(self.itime_cycle)
-                self.is_blanked = False
+                self.light_sensor.integration_time = self.next_setting(
+                        constants.INTEGRATION_TIME_TO_STR, 
+                        self.light_sensor.integration_time,
+                        )
+                self.measurement_buffer.clear()
+            elif self.is_multi_analyte and self.up_button_pressed(buttons):
+                self.scroll_multi_view(-self.repeat_step)
+            elif self.is_multi_analyte and self.down_button_pressed(buttons):
+                self.scroll_multi_view(self.repeat_step)
+            elif self.right_button_pressed(buttons):
+                self.cycle_quick_items(1)
+            elif buttons & constants.BUTTON['left']:
+                self.cycle_quick_items(-1)
 
         elif self.mode == Mode.MENU:
             if self.menu_button_pressed(buttons):
                 self.mode = Mode.MEASURE
             elif self.up_button_pressed(buttons): 
-                self.decr_menu_item_pos()
+                self.menu.move(-self.repeat_step)
             elif self.down_button_pressed(buttons): 
-                self.incr_menu_item_pos()
+                self.menu.move(self.repeat_step)
+            elif buttons & constants.BUTTON['gain']:
+                self.menu.page(-1)
+            elif buttons & constants.BUTTON['itime']:
+                self.menu.page(1)
+            elif buttons & constants.BUTTON['left']:
+                self.menu.jump_next_letter()
             elif self.right_button_pressed(buttons): 
-                selected_item = self.menu_items[self.menu_item_pos]
+                selected_item = self.menu.selected
                 if selected_item == self.ABOUT_STR:
-                    about_msg = f'firmware version {constants.__version__}'
-                    self.message_screen.set_message(about_msg) 
+                    about_lines = [f'firmware {constants.__version__}', 'boot profile']
+                    about_lines.extend(self.boot_profile.report_lines())
+                    self.message_screen.set_lines(about_lines) 
                     self.message_screen.set_to_about()
                     self.mode = Mode.MESSAGE
+                elif selected_item == self.CALIBRATE_STR:
+                    self.start_calibration()
+                elif selected_item == self.PLOT_STR:
+                    self.start_plot()
                 else:
-                    self.measurement_name = self.menu_items[self.menu_item_pos]
+                    self.select_measurement(selected_item)
                     self.mode = Mode.MEASURE
             self.update_menu_screen()
 
+        elif self.mode == Mode.PLOT:
+            if self.menu_button_pressed(buttons):
+                self.mode = Mode.MEASURE
+            elif self.blank_button_pressed(buttons):
+                self.plot_screen.set_name('blanking')
+                self.plot_screen.show()
+                self.blank_sensor(show_progress=False)
+                self.start_plot()
+            elif self.right_button_pressed(buttons):
+                self.start_plot()
+
+        elif self.mode == Mode.CALIBRATE:
+            if self.calibration_coef is None:
+                # Measuring standards
+                if self.up_button_pressed(buttons):
+                    self.calibrate_concentration += self.repeat_step*self.calibrate_step
+                elif self.down_button_pressed(buttons):
+                    concentration = self.calibrate_concentration - self.repeat_step*self.calibrate_step
+                    self.calibrate_concentration = max(concentration, 0.0)
+                elif buttons & constants.BUTTON['itime']:
+                    self.calibrate_step = next(self.calibrate_step_cycle)
+                elif buttons & constants.BUTTON['gain']:
+                    self.toggle_calibration_fit_type()
+                elif self.blank_button_pressed(buttons):
+                    self.active_measure_screen.set_blanking()
+                    self.blank_sensor()
+                elif self.right_button_pressed(buttons):
+                    self.measure_standard()
+                elif buttons & constants.BUTTON['left']:
+                    self.calibration_builder.remove_last()
+                    self.calibrate_status = 'removed last std'
+                elif self.menu_button_pressed(buttons):
+                    self.fit_calibration()
+            else:
+                # Showing fit result
+                if self.right_button_pressed(buttons):
+                    self.save_calibration()
+                elif buttons & constants.BUTTON['left']:
+                    self.calibration_coef = None
+                    self.calibrate_status = ''
+                elif self.menu_button_pressed(buttons):
+                    self.calibration_builder = None
+                    self.calibration_coef = None
+                    self.mode = Mode.MEASURE
+            if self.mode == Mode.CALIBRATE:
+                self.update_calibrate_screen()
+
         elif self.mode == Mode.MESSAGE:
+            # Long messages, e.g. the boot report, are shown a page at a time
+            if self.message_screen.next_page():
+                return
             if self.calibrations.has_errors:
                 error_msg = self.calibrations.pop_error()
                 self.message_screen.set_message(error_msg)
@@ -322,6 +876,114 @@ class Colorimeter:
             else:
                 self.mode = Mode.MEASURE
 
+    def start_plot(self):
+        # Plot the current measurement, absorbance for multi-analyte views
+        name = self.ABSORBANCE_STR if self.is_multi_analyte else self.measurement_name
+        self.plot_screen.clear()
+        self.plot_screen.set_name(name)
+        self.mode = Mode.PLOT
+
+    def update_plot_screen(self):
+        try:
+            if self.is_multi_analyte:
+                value = self.absorbance
+            else:
+                value = self.measurement_value
+        except LightSensorOverflow:
+            return
+        if value is not None and self.mode == Mode.PLOT:
+            self.plot_screen.add(value, self.configuration.precision)
+
+    def start_calibration(self):
+        # Build a new calibration from measured standards. Absorbance mode
+        # is used so that the configured sensor settings and blank apply.
+        self.select_measurement(self.ABSORBANCE_STR)
+        from calibration_builder import CalibrationBuilder
+        self.calibration_builder = CalibrationBuilder()
+        self.calibration_coef = None
+        self.calibrate_concentration = 0.0
+        self.calibrate_status = ''
+        self.mode = Mode.CALIBRATE
+        self.update_calibrate_screen()
+
+    def toggle_calibration_fit_type(self):
+        fit_types = list(self.calibration_builder.FIT_TYPE_TO_DEGREE)
+        index = fit_types.index(self.calibration_builder.fit_type)
+        fit_type = fit_types[(index + 1) % len(fit_types)]
+        self.calibration_builder.set_fit_type(fit_type)
+
+    def measure_standard(self):
+        # Median absorbance of several readings of the current standard
+        self.standard_buffer.clear()
+        try:
+            for i in range(constants.NUM_STANDARD_SAMPLES):
+                self.read_sensor()
+                self.standard_buffer.append(self.absorbance)
+        except LightSensorOverflow:
+            self.calibrate_status = 'overflow'
+            return
+        absorbance = self.standard_buffer.median
+        self.calibration_builder.add(absorbance, self.calibrate_concentration)
+        self.calibrate_status = f'added A={absorbance:1.3f}'
+
+    def fit_calibration(self):
+        from calibration_builder import CalibrationBuilderError
+        try:
+            self.calibration_coef = self.calibration_builder.solve()
+        except CalibrationBuilderError as error:
+            self.calibrate_status = f'{error}'
+
+    def save_calibration(self):
+        name = self.calibrations.new_name(self.CUSTOM_CALIBRATION_PREFIX)
+        data = self.calibration_builder.calibration_data(self.calibration_coef)
+        # Record sensor settings so they are restored when the calibration is used
+        data['gain'] = constants.GAIN_TO_STR[self.light_sensor.gain]
+        data['integration_time'] = constants.INTEGRATION_TIME_TO_STR[self.light_sensor.integration_time]
+        try:
+            self.calibrations.add(name, data)
+        except CalibrationsError as error:
+            self.message_screen.set_message(error)
+            self.message_screen.set_to_error()
+            self.mode = Mode.MESSAGE
+            return
+        self.calibration_builder = None
+        self.calibration_coef = None
+        self.setup_menu_items()
+        self.select_measurement(name)
+        self.mode = Mode.MEASURE
+
+    def update_calibrate_screen(self):
+        builder = self.calibration_builder
+        precision = self.configuration.precision
+        if self.calibration_coef is None:
+            absorbance_str = '---'
+            if self.sample is not None:
+                try:
+                    absorbance_str = f'{self.absorbance:1.{precision}f}'
+                except LightSensorOverflow:
+                    absorbance_str = 'overflow'
+            self.calibrate_screen.set_header('Calibrate')
+            lines = [ 
+                    f'std {builder.num_points+1} {self.calibrate_concentration:1.{precision}f}',
+                    f'step {self.calibrate_step}',
+                    f'abs {absorbance_str}',
+                    f'{builder.fit_type} n={builder.num_points}',
+                    self.calibrate_status,
+                    ]
+        else:
+            coef = self.calibration_coef
+            residuals = builder.residuals(coef)
+            max_residual = max([abs(r) for r in residuals])
+            self.calibrate_screen.set_header('Fit Result')
+            lines = [
+                    f'{builder.fit_type} n={builder.num_points}',
+                    f'R2 {builder.r_squared(coef):1.4f}',
+                    f'max res {max_residual:1.{precision}f}',
+                    'right=save left=back',
+                    'menu=discard',
+                    ]
+        self.calibrate_screen.set_lines(lines, highlight=0)
+
     def check_debounce(self):
         button_dt = time.monotonic() - self.last_button_press
         if button_dt < constants.DEBOUNCE_DT: 
@@ -329,26 +991,60 @@ class Colorimeter:
         else:
             return True
 
+    def preliminary_blank(self):
+        # Blank used until the user blanks, shown as blanking progress
+        self.is_preliminary_blank_pending = False
+        try:
+            self.blank_sensor(set_blanked=False)
+        except LightSensorIOError:
+            self.active_measure_screen.set_sensor_error(self.measurement_name)
+
     def run(self):
 
+        # Show the first screen before anything slow, e.g. the preliminary
+        # blank, and complete the boot profile.
+        if self.mode == Mode.MEASURE:
+            self.active_measure_screen.show()
+        elif self.mode in (Mode.MESSAGE, Mode.ABORT):
+            self.message_screen.show()
+        self.boot_profile.stage('frame')
+
         while True:
 
-            # Deal with any button presses
-            self.handle_button_press()
+            # Pick up changes to the settings files. Reloading sets the
+            # sensor settings so can also get a sensor error.
+            if self.mode in (Mode.MEASURE, Mode.MENU):
+                try:
+                    self.check_for_reload()
+                except LightSensorIOError:
+                    self.active_measure_screen.set_sensor_error(self.measurement_name)
+
+            # Free rarely used screens if memory is getting low
+            if self.mode == Mode.MEASURE:
+                self.screen_manager.release_unused()
+
+            # Deal with any button presses. A sensor error here, e.g. during
+            # blanking, only costs the current frame.
+            try:
+                self.handle_button_press()
+            except LightSensorIOError:
+                self.active_measure_screen.set_sensor_error(self.measurement_name)
 
             # Update display based on the current operating mode
             if self.mode == Mode.MEASURE:
 
-                # Get measurement and result to measurment screen
+                if self.is_preliminary_blank_pending and not (self.is_blanked or self.is_raw_sensor):
+                    self.preliminary_blank()
+
+                # Get new measurement, if available, and send result to
+                # measurement screen. 
                 try:
-                    self.measure_screen.set_measurement(
-                            self.measurement_name, 
-                            self.measurement_units, 
-                            self.measurement_value,
-                            self.configuration.precision
-                            )
-                except LightSensorOverflow:
-                    self.measure_screen.set_overflow(self.measurement_name)
+                    is_new_sample = self.update_sensor()
+                except LightSensorIOError:
+                    self.active_measure_screen.set_sensor_error(self.measurement_name)
+                else:
+                    if is_new_sample:
+                        self.update_measurement_screen()
 
                 # Display whether or not we have blanking data. Not relevant
                 # when device is displaying raw sensor data
@@ -356,26 +1052,54 @@ class Colorimeter:
                     self.measure_screen.set_blanked()
                     gain = self.light_sensor.gain
                     itime = self.light_sensor.integration_time
+                    if self.sample is not None:
+                        gain = self.sample.gain
+                        itime = self.sample.integration_time
                     self.measure_screen.set_gain(gain)
                     self.measure_screen.set_integration_time(itime)
                 else:
-                    if self.is_blanked:
-                        self.measure_screen.set_blanked()
+                    screen = self.active_measure_screen
+                    if self.is_sample_blanked:
+                        if self.is_averaging and len(self.measurement_buffer) > 1:
+                            screen.set_std(
+                                    self.measurement_buffer.std,
+                                    self.configuration.precision
+                                    )
+                        else:
+                            screen.set_blanked()
                     else:
-                        self.measure_screen.set_not_blanked()
+                        screen.set_not_blanked()
                     self.measure_screen.clear_gain()
                     self.measure_screen.clear_integration_time()
 
-                # Update and display measurement of battery voltage
-                self.battery_monitor.update()
-                battery_voltage = self.battery_monitor.voltage_lowpass
-                self.measure_screen.set_bat(battery_voltage)
+                # Update and display battery state of charge, sampled at its
+                # own lower rate
+                if self.battery_monitor.update():
+                    self.measure_screen.set_bat(self.battery_monitor.percent)
 
-                self.measure_screen.show()
+                self.active_measure_screen.show()
 
             elif self.mode == Mode.MENU:
                 self.menu_screen.show()
 
+            elif self.mode == Mode.PLOT:
+                # Only the new sample's column is drawn so plotting keeps 
+                # up with the sensor
+                try:
+                    if self.update_sensor():
+                        self.update_plot_screen()
+                except LightSensorIOError:
+                    pass
+                self.plot_screen.show()
+
+            elif self.mode == Mode.CALIBRATE:
+                try:
+                    if self.update_sensor():
+                        self.update_calibrate_screen()
+                except LightSensorIOError:
+                    self.calibrate_status = 'sensor error'
+                self.calibrate_screen.show()
+
             elif self.mode in (Mode.MESSAGE, Mode.ABORT):
                 self.message_screen.show()
 
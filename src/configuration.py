@@ -14,6 +14,18 @@ class Configuration(JsonSettingsFile):
     LOAD_ERROR_EXCEPTION = ConfigurationError
     ALLOWED_PRECISION = (2,3,4)
     DEFAULT_PRECISION = 2
+    DEFAULT_AUTO_RANGE = False
+    DEFAULT_AVERAGING_WINDOW = 1
+    MAX_AVERAGING_WINDOW = 100
+    ALLOWED_BLANK_MODES = ('fixed', 'adaptive')
+    DEFAULT_BLANK_MODE = 'fixed'
+    DEFAULT_BLANK_TOLERANCE = 0.001
+    DEFAULT_BLANK_TIME_BUDGET = 10.0
+    DEFAULT_SAVE_BLANKS = False
+    DEFAULT_OVERSAMPLE = 1
+    MAX_OVERSAMPLE = 16
+    DEFAULT_TARGET_PRECISION = None
+    MAX_FAVORITES = 10
 
     def __init__(self):
         super().__init__()
@@ -25,31 +37,32 @@ class Configuration(JsonSettingsFile):
             gain_str = self.data['gain']
         except KeyError:
             error_msg = f'{self.FILE_TYPE} missing gain'
-            error_dict['gain'] = error_msg
+            self.error_dict['gain'] = error_msg
         else:
             try:
                 gain = constants.STR_TO_GAIN[gain_str]
             except KeyError:
                 error_msg = f'{self.FILE_TYPE} unknown gain {gain_str}'
-                error_dict['gain'] = error_msg
+                self.error_dict['gain'] = error_msg
 
         # Check integration time
         try:
             itime_str = self.data['integration_time']
         except KeyError:
             error_msg = f'{self.FILE_TYPE} missing integration time'
-            error_dict['integration_time'] = error_msg
+            self.error_dict['integration_time'] = error_msg
         else:
 
             try:
                 itime = constants.STR_TO_INTEGRATION_TIME[itime_str]
             except KeyError:
                 error_msg = f'{self.FILE_TYPE} unknown integration time {itime_str}'
-                error_dict['integration_time'] = error_msg
+                self.error_dict['integration_time'] = error_msg
 
         # Remove configurations with errors
         for name in self.error_dict:
-            del self.data[name]
+            if name in self.data:
+                del self.data[name]
 
         # Check precision
         self.data.setdefault('precision', self.DEFAULT_PRECISION)
@@ -60,7 +73,91 @@ class Configuration(JsonSettingsFile):
         else:
             if not precision in self.ALLOWED_PRECISION:
                 error_msg = f'precision must be in{self.ALLOWED_PRECISION}'
-                error_dict['precision'] = error_msg
+                self.error_dict['precision'] = error_msg
+
+        # Check auto range
+        self.data.setdefault('auto_range', self.DEFAULT_AUTO_RANGE)
+        if type(self.data['auto_range']) != bool:
+            error_msg = f'{self.FILE_TYPE} auto_range must be true or false'
+            self.error_dict['auto_range'] = error_msg
+            self.data['auto_range'] = self.DEFAULT_AUTO_RANGE
+
+        # Check save blanks
+        self.data.setdefault('save_blanks', self.DEFAULT_SAVE_BLANKS)
+        if type(self.data['save_blanks']) != bool:
+            error_msg = f'{self.FILE_TYPE} save_blanks must be true or false'
+            self.error_dict['save_blanks'] = error_msg
+            self.data['save_blanks'] = self.DEFAULT_SAVE_BLANKS
+
+        # Check averaging window
+        self.data.setdefault('averaging_window', self.DEFAULT_AVERAGING_WINDOW)
+        window = self.data['averaging_window']
+        if type(window) != int or window < 1 or window > self.MAX_AVERAGING_WINDOW:
+            error_msg = f'{self.FILE_TYPE} averaging_window must be int from 1 to {self.MAX_AVERAGING_WINDOW}'
+            self.error_dict['averaging_window'] = error_msg
+            self.data['averaging_window'] = self.DEFAULT_AVERAGING_WINDOW
+
+        # Check oversampling
+        self.data.setdefault('oversample', self.DEFAULT_OVERSAMPLE)
+        oversample = self.data['oversample']
+        if type(oversample) != int or oversample < 1 or oversample > self.MAX_OVERSAMPLE:
+            error_msg = f'{self.FILE_TYPE} oversample must be int from 1 to {self.MAX_OVERSAMPLE}'
+            self.error_dict['oversample'] = error_msg
+            self.data['oversample'] = self.DEFAULT_OVERSAMPLE
+
+        # Check target absorbance precision (optional)
+        self.data.setdefault('target_precision', self.DEFAULT_TARGET_PRECISION)
+        target_precision = self.data['target_precision']
+        if target_precision is not None:
+            try:
+                target_precision = float(target_precision)
+            except (ValueError, TypeError):
+                target_precision = None
+            if target_precision is None or target_precision <= 0.0:
+                error_msg = f'{self.FILE_TYPE} target_precision must be a number > 0'
+                self.error_dict['target_precision'] = error_msg
+                target_precision = self.DEFAULT_TARGET_PRECISION
+            self.data['target_precision'] = target_precision
+
+        # Check blanking mode, tolerance and time budget
+        self.data.setdefault('blank_mode', self.DEFAULT_BLANK_MODE)
+        if not self.data['blank_mode'] in self.ALLOWED_BLANK_MODES:
+            error_msg = f'{self.FILE_TYPE} blank_mode must be in {self.ALLOWED_BLANK_MODES}'
+            self.error_dict['blank_mode'] = error_msg
+            self.data['blank_mode'] = self.DEFAULT_BLANK_MODE
+        for name, default in ( 
+                ('blank_tolerance', self.DEFAULT_BLANK_TOLERANCE), 
+                ('blank_time_budget', self.DEFAULT_BLANK_TIME_BUDGET),
+                ):
+            self.data.setdefault(name, default)
+            try:
+                value = float(self.data[name])
+            except (ValueError, TypeError):
+                value = None
+            if value is None or value <= 0.0:
+                error_msg = f'{self.FILE_TYPE} {name} must be a number > 0'
+                self.error_dict[name] = error_msg
+                value = default
+            self.data[name] = value
+
+        # Check favorite measurements
+        self.data.setdefault('favorites', [])
+        favorites = self.data['favorites']
+        if type(favorites) != list or len(favorites) > self.MAX_FAVORITES or \
+                any([type(item) != str for item in favorites]):
+            error_msg = f'{self.FILE_TYPE} favorites must be list of up to {self.MAX_FAVORITES} names'
+            self.error_dict['favorites'] = error_msg
+            self.data['favorites'] = []
+
+    def check_favorites(self, names):
+        # Favorites are checked against the measurement names separately as
+        # they depend on the calibrations. Returns True if any are unknown.
+        unknown = [item for item in self.favorites if not item in names]
+        if not unknown:
+            return False
+        error_msg = f'{self.FILE_TYPE} unknown favorites {", ".join(unknown)}'
+        self.error_dict['favorites'] = error_msg
+        return True
 
     @property
     def integration_time(self):
@@ -86,10 +183,46 @@ class Configuration(JsonSettingsFile):
     def startup(self):
         return self.data.get('startup', None)
 
+    @property
+    def favorites(self):
+        return self.data.get('favorites', [])
+
     @property
     def precision(self):
         return self.data['precision']
 
+    @property
+    def auto_range(self):
+        return self.data.get('auto_range', self.DEFAULT_AUTO_RANGE)
+
+    @property
+    def save_blanks(self):
+        return self.data.get('save_blanks', self.DEFAULT_SAVE_BLANKS)
+
+    @property
+    def averaging_window(self):
+        return self.data.get('averaging_window', self.DEFAULT_AVERAGING_WINDOW)
+
+    @property
+    def oversample(self):
+        return self.data.get('oversample', self.DEFAULT_OVERSAMPLE)
+
+    @property
+    def target_precision(self):
+        return self.data.get('target_precision', self.DEFAULT_TARGET_PRECISION)
+
+    @property
+    def blank_mode(self):
+        return self.data.get('blank_mode', self.DEFAULT_BLANK_MODE)
+
+    @property
+    def blank_tolerance(self):
+        return self.data.get('blank_tolerance', self.DEFAULT_BLANK_TOLERANCE)
+
+    @property
+    def blank_time_budget(self):
+        return self.data.get('blank_time_budget', self.DEFAULT_BLANK_TIME_BUDGET)
+
 
 
             
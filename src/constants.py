@@ -5,13 +5,27 @@ import adafruit_tsl2591
 __version__ = '0.1.0'
 
 CALIBRATIONS_FILE = 'calibrations.json'
+CALIBRATIONS_COMPILED_FILE = 'calibrations.bin'
 CONFIGURATION_FILE = 'configuration.json'
+BLANKS_FILE = 'blanks.json'
 SPLASHSCREEN_BMP = 'assets/splashscreen.bmp'
 
 LOOP_DT = 0.1
 BLANK_DT = 0.05
-DEBOUNCE_DT = 0.6 
+DEBOUNCE_DT = 0.2 
+REPEAT_DELAY_DT = 0.5
+REPEAT_DT = 0.25
+REPEAT_ACCEL = 0.85
+REPEAT_STEP_COUNT = 10
+NUM_RECENT_ITEMS = 3
+RELOAD_CHECK_DT = 2.0
+BATTERY_SAMPLE_DT = 1.0
+SCREEN_RELEASE_MEM_FREE = 20000
 NUM_BLANK_SAMPLES = 50 
+MIN_BLANK_SAMPLES = 5
+NUM_STANDARD_SAMPLES = 10
+CALIBRATE_STEPS = (0.01, 0.1, 1.0, 10.0)
+PRELOAD_GLYPHS = '0123456789 .,:;%=+-()/*>' + 'abcdefghijklmnopqrstuvwxyz' + 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
 BATTERY_AIN_PIN = board.A6
 
 BUTTON = { 
@@ -44,6 +58,16 @@ STR_TO_GAIN = collections.OrderedDict([
         ])
 GAIN_TO_STR = {v:k for k,v in STR_TO_GAIN.items()}
 
+# Nominal TSL2591 gain multipliers (relative to low gain). The true ratios
+# differ by part, blanks are only moved between gains by measured ratios,
+# see GainRatioMeter.
+GAIN_TO_FACTOR = {
+        adafruit_tsl2591.GAIN_LOW  :    1.0,
+        adafruit_tsl2591.GAIN_MED  :   25.0,
+        adafruit_tsl2591.GAIN_HIGH :  428.0,
+        adafruit_tsl2591.GAIN_MAX  : 9876.0,
+        }
+
 STR_TO_INTEGRATION_TIME = collections.OrderedDict([
         ('100ms', adafruit_tsl2591.INTEGRATIONTIME_100MS),
         ('200ms', adafruit_tsl2591.INTEGRATIONTIME_200MS),
@@ -53,3 +77,12 @@ STR_TO_INTEGRATION_TIME = collections.OrderedDict([
         ('600ms', adafruit_tsl2591.INTEGRATIONTIME_600MS),
         ])
 INTEGRATION_TIME_TO_STR = {v:k for k,v in STR_TO_INTEGRATION_TIME.items()}
+
+INTEGRATION_TIME_TO_MS = {
+        adafruit_tsl2591.INTEGRATIONTIME_100MS : 100,
+        adafruit_tsl2591.INTEGRATIONTIME_200MS : 200,
+        adafruit_tsl2591.INTEGRATIONTIME_300MS : 300,
+        adafruit_tsl2591.INTEGRATIONTIME_400MS : 400,
+        adafruit_tsl2591.INTEGRATIONTIME_500MS : 500,
+        adafruit_tsl2591.INTEGRATIONTIME_600MS : 600,
+        }
@@ -0,0 +1,143 @@
+import os
+import struct
+import displayio
+import bitmaptools
+from fontio import Glyph
+from adafruit_bitmap_font import bitmap_font
+
+
+class CachedFont:
+
+    # Font whose glyphs are read from a compact cache file written on an
+    # earlier boot. The cache holds only the glyphs the UI has preloaded, with
+    # packed 1 bit rows read straight into the glyph bitmaps. The pcf file is
+    # only parsed if a glyph is missing from the cache, or the cache is out of
+    # date, in which case the cache is rewritten by save().
+
+    MAGIC = b'GLYC'
+    VERSION = 1
+    HEADER_FORMAT = '<4sBIIhhhhhhH'
+    GLYPH_FORMAT = '<HBBbbb'
+
+    def __init__(self, pcf_file, cache_file):
+        self.pcf_file = pcf_file
+        self.cache_file = cache_file
+        self.source = None
+        self.glyphs = {}
+        self.is_changed = False
+        if not self.load_cache():
+            self.load_source()
+
+    def pcf_stat(self):
+        stat = os.stat(self.pcf_file)
+        return stat[6], int(stat[8])
+
+    def load_source(self):
+        self.source = bitmap_font.load_font(self.pcf_file)
+        self.bounding_box = self.source.get_bounding_box()
+        self.ascent = self.source.ascent
+        self.descent = self.source.descent
+        self.is_changed = True
+
+    def load_cache(self):
+        # Returns False if the cache is missing, corrupt or out of date
+        try:
+            with open(self.cache_file, 'rb') as f:
+                header_size = struct.calcsize(self.HEADER_FORMAT)
+                header = struct.unpack(self.HEADER_FORMAT, f.read(header_size))
+                magic, version, size, mtime = header[:4]
+                if magic != self.MAGIC or version != self.VERSION:
+                    return False
+                if (size, mtime) != self.pcf_stat():
+                    return False
+                self.bounding_box = header[4:8]
+                self.ascent, self.descent, num_glyphs = header[8:]
+                glyph_size = struct.calcsize(self.GLYPH_FORMAT)
+                for i in range(num_glyphs):
+                    glyph_data = struct.unpack(self.GLYPH_FORMAT, f.read(glyph_size))
+                    code_point, width, height, dx, dy, shift_x = glyph_data
+                    bitmap = displayio.Bitmap(max(width, 1), max(height, 1), 2)
+                    if width and height:
+                        bitmaptools.readinto(
+                                bitmap,
+                                f,
+                                1,
+                                element_size = 1,
+                                reverse_pixels_in_element = True,
+                                )
+                    self.glyphs[code_point] = Glyph(bitmap, 0, width, height, dx, dy, shift_x, 0)
+        except (OSError, EOFError, ValueError, struct.error):
+            self.glyphs = {}
+            return False
+        return True
+
+    def get_bounding_box(self):
+        return self.bounding_box
+
+    def get_glyph(self, code_point):
+        try:
+            return self.glyphs[code_point]
+        except KeyError:
+            pass
+        if self.source is None:
+            self.load_source()
+        glyph = self.source.get_glyph(code_point)
+        if glyph is not None:
+            self.glyphs[code_point] = glyph
+            self.is_changed = True
+        return glyph
+
+    def load_glyphs(self, code_points):
+        if isinstance(code_points, str):
+            code_points = [ord(c) for c in code_points]
+        missing = [c for c in code_points if not c in self.glyphs]
+        if not missing:
+            return
+        if self.source is None:
+            self.load_source()
+        self.source.load_glyphs(missing)
+        for code_point in missing:
+            self.get_glyph(code_point)
+
+    def save(self):
+        # Write glyphs to the cache file. Returns False if the filesystem is
+        # not writable.
+        try:
+            with open(self.cache_file, 'wb') as f:
+                f.write(struct.pack(
+                    self.HEADER_FORMAT,
+                    self.MAGIC,
+                    self.VERSION,
+                    *self.pcf_stat(),
+                    *self.bounding_box,
+                    self.ascent,
+                    self.descent,
+                    len(self.glyphs),
+                    ))
+                for code_point, glyph in self.glyphs.items():
+                    f.write(struct.pack(
+                        self.GLYPH_FORMAT,
+                        code_point,
+                        glyph.width,
+                        glyph.height,
+                        glyph.dx,
+                        glyph.dy,
+                        glyph.shift_x,
+                        ))
+                    f.write(self.pack_rows(glyph))
+        except OSError:
+            return False
+        self.is_changed = False
+        return True
+
+    def pack_rows(self, glyph):
+        # Glyph pixels as rows of bytes, most significant bit first
+        row_bytes = (glyph.width + 7)//8
+        buf = bytearray(row_bytes*glyph.height)
+        x0 = glyph.tile_index*glyph.width
+        for y in range(glyph.height):
+            for x in range(glyph.width):
+                if glyph.bitmap[x0 + x, y]:
+                    buf[y*row_bytes + x//8] |= 0x80 >> (x % 8)
+        return buf
+
@@ -1,5 +1,20 @@
-from adafruit_bitmap_font import bitmap_font
+from font_cache import CachedFont
 
 fontname = 'Hack-Bold'
-font_14pt = bitmap_font.load_font(f'/assets/{fontname}-14.pcf')
-font_10pt = bitmap_font.load_font(f'/assets/{fontname}-10.pcf')
+font_14pt = CachedFont(f'/assets/{fontname}-14.pcf', f'{fontname}-14.glyphs')
+font_10pt = CachedFont(f'/assets/{fontname}-10.pcf', f'{fontname}-10.glyphs')
+all_fonts = (font_14pt, font_10pt)
+
+
+def preload(text):
+    # Load the glyphs for all characters in text in one pass over each font
+    code_points = set(ord(c) for c in text)
+    for font in all_fonts:
+        font.load_glyphs(code_points)
+
+
+def save_caches():
+    # Rewrite the glyph caches of fonts which have loaded new glyphs
+    for font in all_fonts:
+        if font.is_changed:
+            font.save()
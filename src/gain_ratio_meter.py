@@ -0,0 +1,59 @@
+class GainRatioMeter:
+
+    # Measures the true ratio of two sensor gains on the same light, either
+    # side of an auto range gain switch. The gains differ from their nominal
+    # factors by a few percent, and from part to part, so a blank taken at
+    # one gain is only used at another once their ratio has been measured.
+    # The light is taken as steady when consecutive samples at the same
+    # settings agree within the tolerance. A switch with an unmeasured ratio
+    # is held for up to MAX_HOLDS samples while waiting for steady light.
+
+    TOLERANCE = 0.01
+    MIN_COUNTS = 1000
+    MAX_HOLDS = 2
+
+    def __init__(self, blank_cache):
+        self.blank_cache = blank_cache
+        self.last = None
+        self.steady_value = None
+        self.before = None
+        self.num_held = 0
+
+    def add(self, sample):
+        # Update the steady value with a new sample and complete a pending
+        # measurement once the light is steady at the new gain.
+        last = self.last
+        self.last = None
+        self.steady_value = None
+        if sample.is_overflow or sample.counts < self.MIN_COUNTS:
+            return
+        value = sample.normalized
+        self.last = (sample.gain, sample.integration_time, value)
+        if last is None or last[:2] != self.last[:2]:
+            return
+        if abs(value - last[2]) > self.TOLERANCE*value:
+            return
+        self.steady_value = 0.5*(value + last[2])
+        if self.before is not None and self.before[0] != sample.gain:
+            gain, before_value = self.before
+            self.blank_cache.set_gain_ratio(gain, before_value, sample.gain, self.steady_value)
+            self.before = None
+
+    def hold(self, sample, new_gain):
+        # Called before auto range switches settings. Returns True if the
+        # switch should wait for another sample so the ratio of the two gains
+        # can be measured.
+        self.before = None
+        if new_gain == sample.gain or self.blank_cache.has_gain_ratio(sample.gain, new_gain):
+            self.num_held = 0
+            return False
+        if sample.is_overflow or sample.counts < self.MIN_COUNTS:
+            self.num_held = 0
+            return False
+        if self.steady_value is None and self.num_held < self.MAX_HOLDS:
+            self.num_held += 1
+            return True
+        self.num_held = 0
+        if self.steady_value is not None:
+            self.before = (sample.gain, self.steady_value)
+        return False
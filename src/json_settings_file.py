@@ -15,6 +15,7 @@ class JsonSettingsFile:
     def __init__(self):
         self.data = {}
         self.error_dict = OrderedDict()
+        self.stat = None
 
     @property
     def has_errors(self):
@@ -34,8 +35,22 @@ class JsonSettingsFile:
             error_msg = None
         return error_msg
 
+    def file_stat(self):
+        # Size and mtime of the file, None if it doesn't exist
+        try:
+            stat = os.stat(self.FILE_NAME)
+        except OSError:
+            return None
+        return stat[6], stat[8]
+
+    @property
+    def has_changed(self):
+        # True if the file has changed since it was loaded
+        return self.file_stat() != self.stat
+
     def load(self):
         self.data = {}
+        self.stat = self.file_stat()
         if self.FILE_NAME in os.listdir():
             try:
                 with open(self.FILE_NAME, 'r') as f:
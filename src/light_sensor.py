@@ -1,6 +1,10 @@
+import time
 import busio
 import board
+import digitalio
+import constants
 import adafruit_tsl2591
+from adafruit_bus_device.i2c_device import I2CDevice
 
 
 class LightSensor:
@@ -11,17 +15,45 @@ class LightSensor:
     DEFAULT_GAIN = adafruit_tsl2591.GAIN_MED
     DEFAULT_INTEGRATION_TIME = adafruit_tsl2591.INTEGRATIONTIME_500MS
 
+    # TSL2591 registers used for non-blocking acquisition 
+    TSL2591_ADDRESS = 0x29
+    TSL2591_COMMAND_BIT = 0xA0
+    TSL2591_REGISTER_ENABLE = 0x00
+    TSL2591_REGISTER_STATUS = 0x13
+    TSL2591_REGISTER_CHAN0_LOW = 0x14
+    TSL2591_ENABLE_POWERON = 0x01
+    TSL2591_ENABLE_AEN = 0x02
+    TSL2591_STATUS_AVALID = 0x01
+
+    POLL_DT = 0.005
+
+    # Bus timeout, integration deadline and recovery settings
+    I2C_TIMEOUT_US = 1000
+    DEADLINE_MARGIN = 0.1
+    DEADLINE_FACTOR = 1.5
+    MAX_RECOVERY_ATTEMPTS = 3
+    RECOVERY_DT = 0.01
+    CLOCK_OUT_DT = 0.00001
+    CLOCK_OUT_PULSES = 9
+
+    # Errors raised by busio and the device driver on a bus fault
+    I2C_ERRORS = (OSError, RuntimeError, ValueError)
+
     def __init__(self):
 
+        self.is_busy = False
+        self.channel = 0
+        self._buffer = bytearray(4)
+        self._deadline = 0.0
+        self._i2c = None
+        self._gain = self.DEFAULT_GAIN
+        self._integration_time = self.DEFAULT_INTEGRATION_TIME
+
         # Set up light sensor
-        i2c = busio.I2C(board.SCL, board.SDA)
         try:
-            self._device = adafruit_tsl2591.TSL2591(i2c)
-        except ValueError as error:
+            self._setup()
+        except self.I2C_ERRORS as error:
             raise LightSensorIOError(error)
-        self.gain = self.DEFAULT_GAIN 
-        self.integration_time = self.DEFAULT_INTEGRATION_TIME 
-        self.channel = 0
 
     @property
     def max_counts(self):
@@ -30,13 +62,67 @@ class LightSensor:
         else:
             return self.TSL2591_MAX_COUNT 
 
+    @property
+    def range_factor(self):
+        return range_factor(self.gain, self.integration_time)
+
+    def start(self):
+        # Start a new integration with the current settings and return
+        # immediately. Toggling AEN clears the ALS valid status bit.
+        self._transaction(self._write_u8, 
+                self.TSL2591_REGISTER_ENABLE, 
+                self.TSL2591_ENABLE_POWERON
+                )
+        self._transaction(self._write_u8, 
+                self.TSL2591_REGISTER_ENABLE, 
+                self.TSL2591_ENABLE_POWERON | self.TSL2591_ENABLE_AEN
+                )
+        self.is_busy = True
+        itime = self.integration_time_ms*1.0e-3
+        self._deadline = time.monotonic() + self.DEADLINE_FACTOR*itime + self.DEADLINE_MARGIN
+
+    def poll(self):
+        # Returns True once the integration started by start() is complete.
+        # Raises LightSensorTimeout if it does not complete by the deadline.
+        if not self.is_busy:
+            return False
+        status = self._transaction(self._read_u8, self.TSL2591_REGISTER_STATUS)
+        if status & self.TSL2591_STATUS_AVALID:
+            return True
+        if time.monotonic() > self._deadline:
+            self.is_busy = False
+            self.recover()
+            raise LightSensorTimeout('light sensor integration timed out')
+        return False
+
+    def collect(self):
+        # Read the result of the integration started by start(). Both
+        # channels are read in a single burst so they come from the same
+        # integration. 
+        self.is_busy = False
+        self._transaction(self._read_channels)
+        channels = (
+                self._buffer[0] | (self._buffer[1] << 8),
+                self._buffer[2] | (self._buffer[3] << 8),
+                )
+        return LightSensorSample(
+                channels[self.channel], 
+                channels[1], 
+                self.gain, 
+                self.integration_time, 
+                self.max_counts
+                )
+
     @property
     def value(self):
-        value = self._device.raw_luminosity[self.channel]
-        if value >= self.max_counts:
+        # Blocking read - waits for a full integration 
+        self.start()
+        while not self.poll():
+            time.sleep(self.POLL_DT)
+        sample = self.collect()
+        if sample.is_overflow:
             raise LightSensorOverflow('light sensor reading > max_counts')
-        #print(value)
-        return value
+        return sample.counts
 
     @property
     def gain(self):
@@ -45,7 +131,9 @@ class LightSensor:
     @gain.setter
     def gain(self, value):
         self._gain = value
-        self._device.gain = value
+        self._transaction(setattr, self._device, 'gain', value)
+        if self.is_busy:
+            self.start()
 
     @property
     def integration_time(self):
@@ -54,7 +142,134 @@ class LightSensor:
     @integration_time.setter
     def integration_time(self, value):
         self._integration_time = value
-        self._device.integration_time = value
+        self._transaction(setattr, self._device, 'integration_time', value)
+        if self.is_busy:
+            self.start()
+
+    @property
+    def integration_time_ms(self):
+        return constants.INTEGRATION_TIME_TO_MS[self.integration_time]
+
+    def recover(self):
+        # Recover from a bus fault: release the bus, clock out any transfer
+        # left in progress, then re-create the bus and device and restore 
+        # the gain and integration time. Makes a bounded number of attempts.
+        self.is_busy = False
+        for i in range(self.MAX_RECOVERY_ATTEMPTS):
+            try:
+                self._teardown()
+                self._clock_out()
+                self._setup()
+            except self.I2C_ERRORS:
+                time.sleep(self.RECOVERY_DT)
+            else:
+                return True
+        return False
+
+    def _transaction(self, func, *args):
+        # Run an I2C transaction. On a bus fault the bus is recovered and the
+        # error is raised as LightSensorIOError so only the current reading 
+        # is lost.
+        try:
+            return func(*args)
+        except self.I2C_ERRORS as error:
+            self.recover()
+            raise LightSensorIOError(f'light sensor i2c error {error}')
+
+    def _setup(self):
+        self._i2c = busio.I2C(board.SCL, board.SDA, timeout=self.I2C_TIMEOUT_US)
+        self._device = adafruit_tsl2591.TSL2591(self._i2c)
+        self._device.gain = self._gain
+        self._device.integration_time = self._integration_time
+        self._i2c_device = I2CDevice(self._i2c, self.TSL2591_ADDRESS)
+
+    def _teardown(self):
+        if self._i2c is not None:
+            try:
+                self._i2c.deinit()
+            except self.I2C_ERRORS:
+                pass
+            self._i2c = None
+
+    def _clock_out(self):
+        # Clock SCL until a device holding SDA low releases it and then send
+        # a stop condition.
+        scl = digitalio.DigitalInOut(board.SCL)
+        sda = digitalio.DigitalInOut(board.SDA)
+        try:
+            sda.switch_to_input()
+            scl.switch_to_output(value=True, drive_mode=digitalio.DriveMode.OPEN_DRAIN)
+            for i in range(self.CLOCK_OUT_PULSES):
+                if sda.value:
+                    break
+                scl.value = False
+                time.sleep(self.CLOCK_OUT_DT)
+                scl.value = True
+                time.sleep(self.CLOCK_OUT_DT)
+            sda.switch_to_output(value=False, drive_mode=digitalio.DriveMode.OPEN_DRAIN)
+            time.sleep(self.CLOCK_OUT_DT)
+            sda.value = True
+            time.sleep(self.CLOCK_OUT_DT)
+        finally:
+            scl.deinit()
+            sda.deinit()
+
+    def _read_channels(self):
+        self._buffer[0] = self.TSL2591_COMMAND_BIT | self.TSL2591_REGISTER_CHAN0_LOW
+        with self._i2c_device as i2c:
+            i2c.write_then_readinto(self._buffer, self._buffer, out_end=1, in_end=4)
+
+    def _write_u8(self, register, value):
+        self._buffer[0] = self.TSL2591_COMMAND_BIT | register
+        self._buffer[1] = value
+        with self._i2c_device as i2c:
+            i2c.write(self._buffer, end=2)
+
+    def _read_u8(self, register):
+        self._buffer[0] = self.TSL2591_COMMAND_BIT | register
+        with self._i2c_device as i2c:
+            i2c.write_then_readinto(self._buffer, self._buffer, out_end=1, in_end=1)
+        return self._buffer[0]
+
+
+class LightSensorSample:
+
+    # Snapshot of a single integration, or the sum of several integrations
+    # when oversampling. All values derived for a display frame should be
+    # computed from the same sample.
+
+    def __init__(self, counts, ir_counts, gain, integration_time, max_counts, 
+            num_integrations=1):
+        self.counts = counts
+        self.ir_counts = ir_counts
+        self.gain = gain
+        self.integration_time = integration_time
+        self.num_integrations = num_integrations
+        self.max_counts = max_counts*num_integrations
+        self.range_factor = range_factor(gain, integration_time)*num_integrations
+
+    @property
+    def is_overflow(self):
+        return self.counts >= self.max_counts
+
+    def normalize(self, counts):
+        # Convert counts to a value independent of gain and integration time
+        return counts/self.range_factor
+
+    @property
+    def normalized(self):
+        return self.normalize(self.counts)
+
+    @property
+    def ir_normalized(self):
+        return self.normalize(self.ir_counts)
+
+
+def range_factor(gain, integration_time):
+    # Sensitivity of given settings relative to low gain and 100ms
+    gain_factor = constants.GAIN_TO_FACTOR[gain]
+    itime_factor = constants.INTEGRATION_TIME_TO_MS[integration_time]/100
+    return gain_factor*itime_factor
 
 
 class LightSensorOverflow(Exception):
@@ -63,3 +278,6 @@ class LightSensorOverflow(Exception):
 class LightSensorIOError(Exception):
     pass
 
+class LightSensorTimeout(LightSensorIOError):
+    pass
+
@@ -2,10 +2,12 @@ import board
 import displayio
 import constants
 import fonts
+from screen import Screen
+from numeric_display import NumericDisplay
 from adafruit_display_text import label
 
 
-class MeasureScreen:
+class MeasureScreen(Screen):
 
     HEADER_LABEL_Y_SPACING = 18 
     VALUE_LABEL_Y_SPACING =  16  
@@ -17,21 +19,10 @@ class MeasureScreen:
     BATTERY_LABEL_X_POSITION = 10      
 
     def __init__(self):
+        super().__init__()
 
-        # Setup color palette
-        self.color_to_index = {k:i for (i,k) in enumerate(constants.COLOR_TO_RGB)}
-        self.palette = displayio.Palette(len(constants.COLOR_TO_RGB))
-        for i, palette_tuple in enumerate(constants.COLOR_TO_RGB.items()):
-            self.palette[i] = palette_tuple[1]   
-
-        # Create tile grid
-        self.bitmap = displayio.Bitmap( 
-                board.DISPLAY.width, 
-                board.DISPLAY.height, 
-                len(constants.COLOR_TO_RGB)
-                )
-        self.bitmap.fill(self.color_to_index['black'])
-        self.tile_grid = displayio.TileGrid(self.bitmap,pixel_shader=self.palette)
+        # Create background tile grid
+        self.tile_grid = self.create_background()
         font_scale = 1
 
         # Create header text label
@@ -49,21 +40,17 @@ class MeasureScreen:
         header_label_y = bbox[3] + self.HEADER_LABEL_Y_SPACING
         self.header_label.anchored_position = (header_label_x, header_label_y)
 
-        # Create absorbance value text label
-        dummy_value = 0.0
-        value_str = f'{dummy_value:1.2f}'.replace('0','O')
+        # Create absorbance value display, sprite based for fast updates
         text_color = constants.COLOR_TO_RGB['white']
-        self.value_label = label.Label(
-                fonts.font_14pt, 
-                text = value_str, 
-                color = text_color, 
-                scale = font_scale,
-                anchor_point = (0.5,1.0),
+        self.value_display = NumericDisplay(
+                fonts.font_14pt,
+                board.DISPLAY.width,
+                text_color,
                 )
-        bbox = self.value_label.bounding_box
-        value_label_x = board.DISPLAY.width//2
-        value_label_y = header_label_y + bbox[3] + self.VALUE_LABEL_Y_SPACING
-        self.value_label.anchored_position = (value_label_x, value_label_y)
+        value_label_y = header_label_y + self.value_display.height + self.VALUE_LABEL_Y_SPACING
+        self.value_display.tile_grid.x = (board.DISPLAY.width - self.value_display.width)//2
+        self.value_display.tile_grid.y = value_label_y - self.value_display.height
+        self.set_value('0.00', text_color)
         
         # Create text label for blanking info
         # Note: not shown when gain and time labels are shown
@@ -118,7 +105,7 @@ class MeasureScreen:
 
         # Create integration time/window text label
         #bat_str = 'battery 100%'
-        bat_str = 'battery 0.0V'
+        bat_str = 'battery 0%'
         text_color = constants.COLOR_TO_RGB['gray']
         self.bat_label = label.Label(
                 fonts.font_10pt, 
@@ -136,49 +123,64 @@ class MeasureScreen:
         self.group = displayio.Group()
         self.group.append(self.tile_grid)
         self.group.append(self.header_label)
-        self.group.append(self.value_label)
+        self.group.append(self.value_display.tile_grid)
         self.group.append(self.blank_label)
         self.group.append(self.gain_label)
         self.group.append(self.itime_label)
         self.group.append(self.bat_label)
 
+    def set_value(self, text, color):
+        if self.value_display.set_text(text):
+            self.is_dirty = True
+        if self.value_display.set_color(color):
+            self.is_dirty = True
+
     def set_measurement(self, name, units, value, precision):
         if value is None:
-            self.value_label.color = constants.COLOR_TO_RGB['orange']
-            self.value_label.text = 'range error' 
+            self.set_value('range error', constants.COLOR_TO_RGB['orange'])
         else:
             if units is None:
-                self.header_label.text = name
+                self.set_text(self.header_label, name)
                 if type(value) == float:
-                    label_text = f'{value:1.{precision}f}'
+                    value_text = f'{value:1.{precision}f}'
                 else: 
-                    label_text = f'{value}'
+                    value_text = f'{value}'
             else:
-                self.header_label.text = name
-                label_text = f'{value:1.{precision}f} {units}'
-            self.value_label.text = label_text.replace('0','O')
-            self.value_label.color = constants.COLOR_TO_RGB['white']
+                self.set_text(self.header_label, name)
+                value_text = f'{value:1.{precision}f} {units}'
+            self.set_value(value_text, constants.COLOR_TO_RGB['white'])
 
     def set_overflow(self, name):
-        self.header_label.text = name
-        self.value_label.text = 'overflow' 
-        self.value_label.color = constants.COLOR_TO_RGB['red']
+        self.set_text(self.header_label, name)
+        self.set_value('overflow', constants.COLOR_TO_RGB['red'])
+
+    def set_sensor_error(self, name):
+        self.set_text(self.header_label, name)
+        self.set_value('sensor error', constants.COLOR_TO_RGB['red'])
 
     def set_not_blanked(self):
-        self.blank_label.text = ' not blanked'
+        self.set_text(self.blank_label, ' not blanked')
 
-    def set_blanking(self):
-        self.blank_label.text = '  blanking  '
+    def set_blanking(self, progress=None):
+        if progress is None:
+            self.set_text(self.blank_label, '  blanking  ')
+        else:
+            percent = int(100*min(progress, 1.0))
+            self.set_text(self.blank_label, f'blanking {percent:3d}%')
 
     def set_blanked(self):
-        self.blank_label.text = ''
+        self.set_text(self.blank_label, '')
+
+    def set_std(self, value, precision):
+        # Shares the blank label, only shown once blanked
+        self.set_text(self.blank_label, f'sd {value:1.{precision}f}'.replace('0','O'))
 
     def set_gain(self,value):
         if value is not None:
             value_str = constants.GAIN_TO_STR[value]
-            self.gain_label.text = f'gain={value_str}'
+            self.set_text(self.gain_label, f'gain={value_str}')
         else:
-            self.gain_label.text = ''
+            self.set_text(self.gain_label, '')
 
     def clear_gain(self):
         self.set_gain(None)
@@ -186,16 +188,13 @@ class MeasureScreen:
     def set_integration_time(self,value):
         if value is not None:
             value_str = constants.INTEGRATION_TIME_TO_STR[value]
-            self.itime_label.text = f'time={value_str}'
+            self.set_text(self.itime_label, f'time={value_str}')
         else:
-            self.itime_label.text = ''
+            self.set_text(self.itime_label, '')
 
     def clear_integration_time(self):
         self.set_integration_time(None)
 
     def set_bat(self, value):
-        self.bat_label.text = f'battery {value:1.1f}V'
-
-    def show(self):
-        board.DISPLAY.show(self.group)
+        self.set_text(self.bat_label, f'battery {value}%')
 
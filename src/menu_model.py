@@ -0,0 +1,82 @@
+class MenuModel:
+
+    # Position and view window of a menu which can be much longer than the
+    # screen. Display strings are computed once when the items are set so
+    # that only the visible slice needs to be handed to the screen.
+
+    def __init__(self, items_per_screen=1):
+        self.items = []
+        self.texts = []
+        self.items_per_screen = items_per_screen
+        self.reset()
+
+    def reset(self):
+        self.item_pos = 0
+        self.view_pos = 0
+
+    def set_items(self, items, texts):
+        self.items = items
+        self.texts = texts
+        self.item_pos = min(self.item_pos, max(len(items) - 1, 0))
+        self.update_view()
+
+    def set_items_per_screen(self, items_per_screen):
+        self.items_per_screen = items_per_screen
+        self.update_view()
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def selected(self):
+        return self.items[self.item_pos]
+
+    @property
+    def cursor(self):
+        # Position of selected item on the screen
+        return self.item_pos - self.view_pos
+
+    @property
+    def view_texts(self):
+        return self.texts[self.view_pos:self.view_pos + self.items_per_screen]
+
+    def update_view(self):
+        # Scroll the view the minimum amount to keep the selection visible
+        if self.item_pos < self.view_pos:
+            self.view_pos = self.item_pos
+        elif self.item_pos > self.view_pos + self.items_per_screen - 1:
+            self.view_pos = self.item_pos - self.items_per_screen + 1
+        max_view_pos = max(len(self.items) - self.items_per_screen, 0)
+        self.view_pos = min(self.view_pos, max_view_pos)
+
+    def move(self, step):
+        pos = self.item_pos + step
+        self.item_pos = min(max(pos, 0), max(len(self.items) - 1, 0))
+        self.update_view()
+
+    def page(self, step):
+        # Move by whole screens, the view moves with the selection
+        self.view_pos += step*self.items_per_screen
+        self.view_pos = max(self.view_pos, 0)
+        self.move(step*self.items_per_screen)
+
+    def select(self, item):
+        if item in self.items:
+            self.item_pos = self.items.index(item)
+            self.update_view()
+
+    def jump_next_letter(self):
+        # Move to the first item starting with the next letter in the menu,
+        # wrapping around to the top after the last letter.
+        if not self.items:
+            return
+        letter = self.items[self.item_pos][:1].upper()
+        for pos in range(self.item_pos + 1, len(self.items)):
+            if self.items[pos][:1].upper() != letter:
+                self.item_pos = pos
+                break
+        else:
+            self.item_pos = 0
+        self.view_pos = self.item_pos
+        self.update_view()
+
@@ -3,31 +3,21 @@ import displayio
 import terminalio
 import constants
 import fonts
+from screen import Screen
 from adafruit_display_text import label
 from adafruit_display_shapes import line 
 
-class MenuScreen:
+class MenuScreen(Screen):
 
     PADDING_HEADER = 4
     PADDING_ITEM = 5
 
     def __init__(self):
+        super().__init__()
         self.group = displayio.Group()
 
-        # Setup color palette
-        self.color_to_index = {k:i for (i,k) in enumerate(constants.COLOR_TO_RGB)}
-        self.palette = displayio.Palette(len(constants.COLOR_TO_RGB))
-        for i, palette_tuple in enumerate(constants.COLOR_TO_RGB.items()):
-            self.palette[i] = palette_tuple[1]   
-
-        # Create tile grid
-        self.bitmap = displayio.Bitmap( 
-                board.DISPLAY.width, 
-                board.DISPLAY.height, 
-                len(constants.COLOR_TO_RGB)
-                )
-        self.bitmap.fill(self.color_to_index['black'])
-        self.tile_grid = displayio.TileGrid(self.bitmap,pixel_shader=self.palette)
+        # Create background tile grid
+        self.tile_grid = self.create_background()
         font_scale = 1
 
         # Create header text label
@@ -84,20 +74,33 @@ class MenuScreen:
         for item_label in self.item_labels:
             self.group.append(item_label)
 
+        self.curr_item = None
+        for item_label in self.item_labels:
+            self.set_item_highlight(item_label, False)
         self.set_curr_item(0)
 
     def set_menu_items(self, text_list):
-        for item_label, item_text in zip(self.item_labels, text_list):
-            item_label.text = item_text 
-
-    def set_curr_item(self, num):
+        # Only labels whose text has changed are updated
         for i, item_label in enumerate(self.item_labels):
-            if i==num:
-                item_label.color = constants.COLOR_TO_RGB['black']
-                item_label.background_color = constants.COLOR_TO_RGB['orange']
+            if i < len(text_list):
+                self.set_text(item_label, text_list[i])
             else:
-                item_label.color = constants.COLOR_TO_RGB['white']
-                item_label.background_color = constants.COLOR_TO_RGB['black']
+                self.set_text(item_label, '')
+
+    def set_curr_item(self, num):
+        # Only the previous and new current items are recolored
+        if num == self.curr_item:
+            return
+        if self.curr_item is not None:
+            self.set_item_highlight(self.item_labels[self.curr_item], False)
+        self.set_item_highlight(self.item_labels[num], True)
+        self.curr_item = num
+
+    def set_item_highlight(self, item_label, value):
+        if value:
+            self.set_color(item_label, constants.COLOR_TO_RGB['black'])
+            self.set_background_color(item_label, constants.COLOR_TO_RGB['orange'])
+        else:
+            self.set_color(item_label, constants.COLOR_TO_RGB['white'])
+            self.set_background_color(item_label, constants.COLOR_TO_RGB['black'])
 
-    def show(self):
-        board.DISPLAY.show(self.group)
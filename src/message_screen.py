@@ -2,11 +2,12 @@ import board
 import displayio
 import constants
 import fonts
+from screen import Screen
 from adafruit_display_text import label
 from adafruit_display_text import wrap_text_to_lines 
 
 
-class MessageScreen:
+class MessageScreen(Screen):
 
     SPACING_HEADER_LABEL = 10 
     SPACING_MESSAGE_LABEL = 10  
@@ -15,21 +16,10 @@ class MessageScreen:
     NUM_MESSAGE_LABEL = 4
 
     def __init__(self):
+        super().__init__()
 
-        # Setup color palette
-        self.color_to_index = {k:i for (i,k) in enumerate(constants.COLOR_TO_RGB)}
-        self.palette = displayio.Palette(len(constants.COLOR_TO_RGB))
-        for i, palette_tuple in enumerate(constants.COLOR_TO_RGB.items()):
-            self.palette[i] = palette_tuple[1]   
-
-        # Create tile grid
-        self.bitmap = displayio.Bitmap( 
-                board.DISPLAY.width, 
-                board.DISPLAY.height, 
-                len(constants.COLOR_TO_RGB)
-                )
-        self.bitmap.fill(self.color_to_index['black'])
-        self.tile_grid = displayio.TileGrid(self.bitmap,pixel_shader=self.palette)
+        # Create background tile grid
+        self.tile_grid = self.create_background()
         font_scale = 1
 
         # Create header label
@@ -65,6 +55,8 @@ class MessageScreen:
             message_label_y += self.HEIGHT_MESSAGE_LABEL + self.SPACING_MESSAGE_LABEL 
             message_label.anchored_position = (message_label_x, message_label_y)
             self.message_label_list.append(message_label)
+        self.lines = []
+        self.line_pos = 0
         
         # Ceate display group and add items to it
         self.group = displayio.Group()
@@ -79,21 +71,42 @@ class MessageScreen:
         else:
             message_extended = f'{message}'
         wrapped_message = wrap_text_to_lines(message_extended, self.MESSAGE_MAX_CHARS) 
-        for message_label, line in zip(self.message_label_list, wrapped_message):
-            message_label.text = line  
+        self.set_lines(wrapped_message)
+
+    def set_lines(self, lines):
+        # Lines beyond those that fit on the screen are shown on further
+        # pages, see next_page.
+        self.lines = [line[:self.MESSAGE_MAX_CHARS] for line in lines]
+        self.line_pos = 0
+        self.update_lines()
+
+    def update_lines(self):
+        page = self.lines[self.line_pos:self.line_pos + self.NUM_MESSAGE_LABEL]
+        for i, message_label in enumerate(self.message_label_list):
+            line = page[i] if i < len(page) else ''
+            self.set_text(message_label, line)
+
+    @property
+    def has_next_page(self):
+        return self.line_pos + self.NUM_MESSAGE_LABEL < len(self.lines)
+
+    def next_page(self):
+        # Returns False if already on the last page
+        if not self.has_next_page:
+            return False
+        self.line_pos += self.NUM_MESSAGE_LABEL
+        self.update_lines()
+        return True
 
     def set_header(self, header):
-        self.header_label.text = header
+        self.set_text(self.header_label, header)
 
     def set_to_error(self):
-        self.header_label.text = 'Error'
+        self.set_text(self.header_label, 'Error')
 
     def set_to_abort(self):
-        self.header_label.text = 'Abort'
+        self.set_text(self.header_label, 'Abort')
         
     def set_to_about(self):
-        self.header_label.text = 'About'
-
-    def show(self):
-        board.DISPLAY.show(self.group)
+        self.set_text(self.header_label, 'About')
 
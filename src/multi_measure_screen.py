@@ -0,0 +1,148 @@
+import board
+import displayio
+import constants
+import fonts
+from screen import Screen
+from adafruit_display_text import label
+from adafruit_display_shapes import line
+
+
+class MultiMeasureScreen(Screen):
+
+    PADDING_HEADER = 4
+    PADDING_ITEM = 5
+    ITEM_X_SPACING = 2
+    NAME_MAX_CHARS = 9
+
+    def __init__(self):
+        super().__init__()
+
+        # Create background tile grid
+        self.tile_grid = self.create_background()
+        font_scale = 1
+
+        # Create header text label
+        header_str = 'All'
+        self.header_label = label.Label(
+                fonts.font_14pt,
+                text = header_str,
+                color = constants.COLOR_TO_RGB['white'],
+                scale = font_scale,
+                anchor_point = (0.5, 1.0)
+                )
+        header_x = board.DISPLAY.width//2
+        header_y = self.header_label.bounding_box[3] + self.PADDING_HEADER
+        self.header_label.anchored_position = header_x, header_y
+
+        # Create line under header
+        line_y = header_y + self.PADDING_HEADER
+        self.header_line = line.Line(
+                0,
+                line_y,
+                board.DISPLAY.width,
+                line_y,
+                constants.COLOR_TO_RGB['gray']
+                )
+
+        # Create name and value labels for each row. The last row is used
+        # for the blanking information.
+        vert_pix_remaining = board.DISPLAY.height - (line_y + 1)
+        test_label = label.Label(fonts.font_10pt, text='test',scale=font_scale)
+        label_dy = test_label.bounding_box[3] + self.PADDING_ITEM
+        self.items_per_screen = vert_pix_remaining//label_dy - 1
+
+        self.name_labels = []
+        self.value_labels = []
+        for i in range(self.items_per_screen):
+            pos_y = line_y + (i+1)*label_dy
+            name_label = label.Label(
+                     fonts.font_10pt,
+                     text = '',
+                     color = constants.COLOR_TO_RGB['white'],
+                     scale = font_scale,
+                     anchor_point = (0.0, 1.0),
+                     anchored_position = (self.ITEM_X_SPACING, pos_y),
+                     )
+            value_label = label.Label(
+                     fonts.font_10pt,
+                     text = '',
+                     color = constants.COLOR_TO_RGB['white'],
+                     scale = font_scale,
+                     anchor_point = (1.0, 1.0),
+                     anchored_position = (board.DISPLAY.width - self.ITEM_X_SPACING, pos_y),
+                     )
+            self.name_labels.append(name_label)
+            self.value_labels.append(value_label)
+
+        # Create text label for blanking info
+        blank_y = line_y + (self.items_per_screen + 1)*label_dy
+        self.blank_label = label.Label(
+                fonts.font_10pt,
+                text = '',
+                color = constants.COLOR_TO_RGB['orange'],
+                scale = font_scale,
+                anchor_point = (0.5,1.0),
+                anchored_position = (board.DISPLAY.width//2, blank_y),
+                )
+
+        # Ceate display group and add items to it
+        self.group = displayio.Group()
+        self.group.append(self.tile_grid)
+        self.group.append(self.header_label)
+        self.group.append(self.header_line)
+        for name_label, value_label in zip(self.name_labels, self.value_labels):
+            self.group.append(name_label)
+            self.group.append(value_label)
+        self.group.append(self.blank_label)
+
+    def set_values(self, header, names, values, units, precision):
+        # Show values for calibrations. None values are out of range.
+        self.set_text(self.header_label, header)
+        for i, (name_label, value_label) in enumerate(zip(self.name_labels, self.value_labels)):
+            if i < len(names):
+                self.set_text(name_label, names[i][:self.NAME_MAX_CHARS])
+                self.set_color(name_label, constants.COLOR_TO_RGB['white'])
+                if values[i] is None:
+                    self.set_text(value_label, 'range err')
+                    self.set_color(value_label, constants.COLOR_TO_RGB['orange'])
+                else:
+                    value_text = f'{values[i]:1.{precision}f}'
+                    if units[i] is not None:
+                        value_text = f'{value_text} {units[i]}'
+                    self.set_text(value_label, value_text.replace('0','O'))
+                    self.set_color(value_label, constants.COLOR_TO_RGB['white'])
+            else:
+                self.set_text(name_label, '')
+                self.set_text(value_label, '')
+
+    def set_error(self, header, error_str):
+        self.set_text(self.header_label, header)
+        for name_label, value_label in zip(self.name_labels, self.value_labels):
+            self.set_text(name_label, '')
+            self.set_text(value_label, '')
+        self.set_text(self.name_labels[0], error_str)
+        self.set_color(self.name_labels[0], constants.COLOR_TO_RGB['red'])
+
+    def set_overflow(self, name):
+        self.set_error(name, 'overflow')
+
+    def set_sensor_error(self, name):
+        self.set_error(name, 'sensor error')
+
+    def set_not_blanked(self):
+        self.set_text(self.blank_label, ' not blanked')
+
+    def set_blanking(self, progress=None):
+        if progress is None:
+            self.set_text(self.blank_label, '  blanking  ')
+        else:
+            percent = int(100*min(progress, 1.0))
+            self.set_text(self.blank_label, f'blanking {percent:3d}%')
+
+    def set_blanked(self):
+        self.set_text(self.blank_label, '')
+
+    def set_std(self, value, precision):
+        # Standard deviation of absorbance
+        self.set_text(self.blank_label, f'sd A {value:1.{precision}f}'.replace('0','O'))
+
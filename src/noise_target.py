@@ -0,0 +1,105 @@
+import math
+import constants
+from ring_buffer import RingBuffer
+from light_sensor import LightSensor
+from light_sensor import range_factor
+
+
+class NoiseTarget:
+
+    # Picks the integration time and number of integrations (oversampling)
+    # which reach the target absorbance precision in the least total time. 
+    # The relative noise of a single integration is estimated from recent
+    # readings and scaled to other integration times assuming shot noise, 
+    # i.e. relative noise proportional to 1/sqrt(integration time). Since 
+    # A = -log10(I/I0) the absorbance noise is 0.4343 x relative noise. 
+
+    ABSORBANCE_PER_REL_NOISE = 1.0/math.log(10.0)
+    NUM_NOISE_SAMPLES = 10
+    OVERHEAD_MS = 10
+    UPPER_FRACTION = 0.8
+    HYSTERESIS = 0.8
+
+    def __init__(self, light_sensor, oversampler, target_precision, max_num):
+        self.light_sensor = light_sensor
+        self.oversampler = oversampler
+        self.target_precision = target_precision
+        self.max_num = max_num
+        self.buffer = RingBuffer(self.NUM_NOISE_SAMPLES)
+        self.settings = None
+
+    @property
+    def is_enabled(self):
+        return self.target_precision is not None
+
+    @property
+    def target_rel_noise(self):
+        return self.target_precision/self.ABSORBANCE_PER_REL_NOISE
+
+    def update(self, sample):
+        # Update noise estimate with a single integration sample and change
+        # the integration time and oversampling as required. Returns True if
+        # the settings were changed. 
+        settings = (sample.gain, sample.integration_time)
+        if settings != self.settings:
+            self.buffer.clear()
+            self.settings = settings
+        if sample.is_overflow:
+            return False
+        self.buffer.append(sample.normalized)
+        if not self.buffer.is_full or self.buffer.mean <= 0.0:
+            return False
+        rel_noise = self.buffer.std/self.buffer.mean
+        itime, num = self.find_settings(sample, rel_noise)
+        if itime == sample.integration_time and num == self.oversampler.num:
+            return False
+        self.light_sensor.integration_time = itime
+        self.oversampler.num = num
+        return True
+
+    def find_settings(self, sample, rel_noise):
+        # Returns the (integration time, number of integrations) with least
+        # total time meeting the target. If none meet the target the settings 
+        # giving the best precision are used. 
+        itime_ms = constants.INTEGRATION_TIME_TO_MS[sample.integration_time]
+        curr_cost = None
+        best = None 
+        best_cost = None
+        fallback = None
+        fallback_noise = None
+        for itime in constants.STR_TO_INTEGRATION_TIME.values():
+            if itime == constants.STR_TO_INTEGRATION_TIME['100ms']:
+                max_counts = LightSensor.TSL2591_MAX_COUNT_100MS
+            else:
+                max_counts = LightSensor.TSL2591_MAX_COUNT
+            counts = self.buffer.mean*range_factor(sample.gain, itime)
+            if counts > self.UPPER_FRACTION*max_counts:
+                continue
+            ms = constants.INTEGRATION_TIME_TO_MS[itime]
+            itime_rel_noise = rel_noise*(itime_ms/ms)**0.5
+            num = self.num_required(itime_rel_noise)
+            cost = num*(ms + self.OVERHEAD_MS)
+            mean_rel_noise = itime_rel_noise/num**0.5
+            if fallback is None or mean_rel_noise < fallback_noise:
+                fallback = (itime, num)
+                fallback_noise = mean_rel_noise
+            if mean_rel_noise > self.target_rel_noise:
+                continue
+            if itime == sample.integration_time:
+                curr_cost = cost
+            if best is None or cost < best_cost:
+                best = (itime, num)
+                best_cost = cost
+        if best is None:
+            if fallback is None:
+                return (sample.integration_time, self.oversampler.num)
+            return fallback
+        if curr_cost is not None and best_cost > self.HYSTERESIS*curr_cost:
+            # Not enough gain to be worth changing integration time 
+            return (sample.integration_time, self.num_required(rel_noise))
+        return best
+
+    def num_required(self, rel_noise):
+        num = math.ceil((rel_noise/self.target_rel_noise)**2)
+        return min(max(num, 1), self.max_num)
+
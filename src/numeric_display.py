@@ -0,0 +1,111 @@
+import displayio
+import constants
+
+
+class NumericDisplay:
+
+    # Fixed width text display for measurement values. Glyphs from a
+    # monospaced font are rendered once into the cells of a sprite sheet,
+    # one cell per printable ascii character, the first time each character
+    # is used. Setting the text then only changes the tile indices of a
+    # TileGrid so it takes the same time for any value and doesn't create a
+    # new glyph layout. The zero cell is drawn with the 'O' glyph, so values
+    # don't need the '0' to 'O' replacement used with labels.
+
+    FIRST_CHAR = 32
+    LAST_CHAR = 126
+    CHAR_SUBSTITUTES = {'0': 'O'}
+
+    def __init__(self, font, max_width, color, x=0, y=0):
+        self.font = font
+        num_cells = self.LAST_CHAR - self.FIRST_CHAR + 1
+
+        # Cell size from the advance of a digit and the font ascent/descent,
+        # as many cells as fit in max_width pixels
+        self.cell_width = font.get_glyph(ord('0')).shift_x
+        self.cell_height = font.ascent + font.descent
+        self.baseline = font.ascent
+        self.max_chars = max_width//self.cell_width
+
+        self.palette = displayio.Palette(2)
+        self.palette[0] = constants.COLOR_TO_RGB['black']
+        self.palette[1] = color
+        self.color = color
+        self.sheet = displayio.Bitmap(self.cell_width*num_cells, self.cell_height, 2)
+        self.is_rendered = bytearray(num_cells)
+        self.render_char(' ')
+
+        self.tile_grid = displayio.TileGrid(
+                self.sheet,
+                pixel_shader = self.palette,
+                width = self.max_chars,
+                height = 1,
+                tile_width = self.cell_width,
+                tile_height = self.cell_height,
+                default_tile = 0,
+                x = x,
+                y = y,
+                )
+        self.text = ''
+
+    @property
+    def width(self):
+        return self.cell_width*self.max_chars
+
+    @property
+    def height(self):
+        return self.cell_height
+
+    def cell_index(self, char):
+        index = ord(char) - self.FIRST_CHAR
+        if index < 0 or index > self.LAST_CHAR - self.FIRST_CHAR:
+            index = 0
+        return index
+
+    def render_char(self, char):
+        # Copy the glyph into its cell, placed on the common baseline
+        index = self.cell_index(char)
+        self.is_rendered[index] = 1
+        glyph = self.font.get_glyph(ord(self.CHAR_SUBSTITUTES.get(char, char)))
+        if glyph is None:
+            return
+        x0 = index*self.cell_width + glyph.dx
+        y0 = self.baseline - glyph.height - glyph.dy
+        for j in range(glyph.height):
+            y = y0 + j
+            if y < 0 or y >= self.cell_height:
+                continue
+            for i in range(glyph.width):
+                x = x0 + i
+                if x < index*self.cell_width or x >= (index + 1)*self.cell_width:
+                    continue
+                if glyph.bitmap[glyph.tile_index*glyph.width + i, j]:
+                    self.sheet[x, y] = 1
+
+    def set_text(self, text):
+        # Text is centered, characters past max_chars are dropped. Returns
+        # True if the text changed.
+        if text == self.text:
+            return False
+        self.text = text
+        text = text[:self.max_chars]
+        offset = (self.max_chars - len(text))//2
+        for pos in range(self.max_chars):
+            k = pos - offset
+            if 0 <= k < len(text):
+                index = self.cell_index(text[k])
+                if not self.is_rendered[index]:
+                    self.render_char(text[k])
+            else:
+                index = 0
+            self.tile_grid[pos] = index
+        return True
+
+    def set_color(self, color):
+        # Returns True if the color changed
+        if color == self.color:
+            return False
+        self.color = color
+        self.palette[1] = color
+        return True
+
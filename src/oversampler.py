@@ -0,0 +1,50 @@
+from light_sensor import LightSensorSample
+
+
+class Oversampler:
+
+    # Accumulates several short, non-saturating integrations into a single
+    # sample with extended range. The sum is normalized by the total range
+    # factor so it can be used in place of a single integration.
+
+    def __init__(self, num):
+        self.num = num
+        self.clear()
+
+    @property
+    def is_enabled(self):
+        return self.num > 1
+
+    def clear(self):
+        self.count = 0
+        self.counts = 0
+        self.ir_counts = 0
+        self.settings = None
+        self.max_counts = 0
+
+    def add(self, sample):
+        # Add sample to sum. Returns True when the sum is complete.  
+        settings = (sample.gain, sample.integration_time)
+        if settings != self.settings:
+            self.clear()
+            self.settings = settings
+        self.counts += sample.counts
+        self.ir_counts += sample.ir_counts
+        self.max_counts = sample.max_counts
+        self.count += 1
+        return self.count >= self.num
+
+    def pop(self):
+        # Get accumulated sample and start a new sum
+        gain, itime = self.settings
+        sample = LightSensorSample(
+                self.counts, 
+                self.ir_counts, 
+                gain, 
+                itime, 
+                self.max_counts, 
+                num_integrations = self.count
+                )
+        self.clear()
+        return sample
+
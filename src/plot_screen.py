@@ -0,0 +1,184 @@
+import board
+import displayio
+import bitmaptools
+import constants
+import fonts
+from screen import Screen
+from ring_buffer import RingBuffer
+from adafruit_display_text import label
+
+
+class PlotScreen(Screen):
+
+    # Strip chart of a measurement over time. Each sample is one column of
+    # the plot bitmap, which is used as a ring with the same slots as the
+    # value buffer. Two TileGrids showing the bitmap are placed side by side
+    # and offset so the oldest column is at the left edge. Scrolling only
+    # moves the TileGrids and each sample draws just its own column. The
+    # whole trace is only redrawn when the y axis is rescaled, which uses
+    # hysteresis so that happens rarely.
+
+    PLOT_Y = 22
+    HEADER_X_SPACING = 2
+    SCALE_LABEL_X = 2
+    MARGIN_FRACTION = 0.1
+    SHRINK_FRACTION = 0.25
+    MIN_SPAN = 1.0e-3
+
+    def __init__(self):
+        super().__init__()
+
+        # Create background tile grid
+        self.tile_grid = self.create_background()
+        font_scale = 1
+
+        # Plot bitmap with its own two color palette, trace and background
+        self.plot_width = board.DISPLAY.width
+        self.plot_height = board.DISPLAY.height - self.PLOT_Y
+        self.plot_palette = displayio.Palette(2)
+        self.plot_palette[0] = constants.COLOR_TO_RGB['black']
+        self.plot_palette[1] = constants.COLOR_TO_RGB['orange']
+        self.plot_bitmap = displayio.Bitmap(self.plot_width, self.plot_height, 2)
+        self.plot_grids = []
+        for i in range(2):
+            plot_grid = displayio.TileGrid(
+                    self.plot_bitmap,
+                    pixel_shader = self.plot_palette,
+                    x = 0,
+                    y = self.PLOT_Y,
+                    )
+            self.plot_grids.append(plot_grid)
+        self.values = RingBuffer(self.plot_width)
+
+        # Create header labels for name and latest value
+        self.header_label = label.Label(
+                fonts.font_10pt,
+                text = '',
+                color = constants.COLOR_TO_RGB['white'],
+                scale = font_scale,
+                anchor_point = (0.0, 1.0),
+                anchored_position = (self.HEADER_X_SPACING, self.PLOT_Y - 4),
+                )
+        self.value_label = label.Label(
+                fonts.font_10pt,
+                text = '',
+                color = constants.COLOR_TO_RGB['white'],
+                scale = font_scale,
+                anchor_point = (1.0, 1.0),
+                anchored_position = (board.DISPLAY.width - self.HEADER_X_SPACING, self.PLOT_Y - 4),
+                )
+
+        # Create y axis scale labels
+        self.max_label = label.Label(
+                fonts.font_10pt,
+                text = '',
+                color = constants.COLOR_TO_RGB['gray'],
+                scale = font_scale,
+                anchor_point = (0.0, 0.0),
+                anchored_position = (self.SCALE_LABEL_X, self.PLOT_Y + 2),
+                )
+        self.min_label = label.Label(
+                fonts.font_10pt,
+                text = '',
+                color = constants.COLOR_TO_RGB['gray'],
+                scale = font_scale,
+                anchor_point = (0.0, 1.0),
+                anchored_position = (self.SCALE_LABEL_X, board.DISPLAY.height - 2),
+                )
+
+        # Ceate display group and add items to it
+        self.group = displayio.Group()
+        self.group.append(self.tile_grid)
+        for plot_grid in self.plot_grids:
+            self.group.append(plot_grid)
+        self.group.append(self.header_label)
+        self.group.append(self.value_label)
+        self.group.append(self.max_label)
+        self.group.append(self.min_label)
+
+        self.clear()
+
+    def clear(self):
+        self.values.clear()
+        self.y_min = None
+        self.y_max = None
+        self.plot_bitmap.fill(0)
+        self.set_text(self.max_label, '')
+        self.set_text(self.min_label, '')
+        self.set_text(self.value_label, '')
+        self.update_scroll()
+        self.is_dirty = True
+
+    def set_name(self, name):
+        self.set_text(self.header_label, name)
+
+    def add(self, value, precision):
+        self.values.append(value)
+        self.set_text(self.value_label, f'{value:1.{precision}f}'.replace('0','O'))
+        if self.needs_rescale(value):
+            self.rescale(precision)
+        else:
+            slot = (self.values.head - 1) % self.values.size
+            prev_value = self.values[-2] if len(self.values) > 1 else value
+            self.draw_column(slot, self.value_to_row(prev_value), self.value_to_row(value))
+        self.update_scroll()
+        self.is_dirty = True
+
+    def needs_rescale(self, value):
+        # Rescale when the value is off the plot or the data only uses a
+        # small part of the y axis
+        if self.y_min is None:
+            return True
+        if value < self.y_min or value > self.y_max:
+            return True
+        y_min, y_max = self.target_range()
+        return (y_max - y_min) < self.SHRINK_FRACTION*(self.y_max - self.y_min)
+
+    def target_range(self):
+        # Data range with a margin at top and bottom
+        data_min = self.values.min
+        data_max = self.values.max
+        span = max(data_max - data_min, self.MIN_SPAN)
+        mid = 0.5*(data_min + data_max)
+        half = 0.5*span*(1.0 + 2.0*self.MARGIN_FRACTION)
+        return mid - half, mid + half
+
+    def rescale(self, precision):
+        self.y_min, self.y_max = self.target_range()
+        self.set_text(self.max_label, f'{self.y_max:1.{precision}f}'.replace('0','O'))
+        self.set_text(self.min_label, f'{self.y_min:1.{precision}f}'.replace('0','O'))
+        self.redraw()
+
+    def redraw(self):
+        # Draw all columns, oldest to newest
+        self.plot_bitmap.fill(0)
+        if self.values.is_full:
+            start = self.values.head
+        else:
+            start = 0
+        prev_row = None
+        for i in range(len(self.values)):
+            row = self.value_to_row(self.values[i])
+            if prev_row is None:
+                prev_row = row
+            self.draw_column((start + i) % self.values.size, prev_row, row)
+            prev_row = row
+
+    def value_to_row(self, value):
+        frac = (self.y_max - value)/(self.y_max - self.y_min)
+        row = int(frac*(self.plot_height - 1))
+        return min(max(row, 0), self.plot_height - 1)
+
+    def draw_column(self, col, prev_row, row):
+        # Vertical segment from the previous row so the trace is connected
+        row_lo = min(prev_row, row)
+        row_hi = max(prev_row, row)
+        bitmaptools.fill_region(self.plot_bitmap, col, 0, col + 1, self.plot_height, 0)
+        bitmaptools.fill_region(self.plot_bitmap, col, row_lo, col + 1, row_hi + 1, 1)
+
+    def update_scroll(self):
+        # Oldest column at the left edge and the newest at the right edge
+        head = self.values.head
+        self.plot_grids[0].x = -head
+        self.plot_grids[1].x = self.plot_width - head
+
@@ -0,0 +1,109 @@
+import ulab.numpy as np
+
+
+class RingBuffer:
+
+    # Fixed size buffer of the most recent values with running statistics.
+    # Appending is O(1) and does not allocate. The running mean and variance
+    # use a sliding window form of Welford's method and are recomputed from
+    # the buffer once per wrap to remove accumulated rounding error.
+
+    def __init__(self, size):
+        self.size = size
+        self.data = np.zeros((size,))
+        self.clear()
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._min = None
+        self._max = None
+        self._min_stale = False
+        self._max_stale = False
+
+    @property
+    def is_full(self):
+        return self.count == self.size
+
+    @property
+    def values(self):
+        if self.is_full:
+            return self.data
+        else:
+            return self.data[:self.count]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        # Values indexed from oldest (0) to newest (count-1)
+        if index < 0:
+            index += self.count
+        if index < 0 or index >= self.count:
+            raise IndexError('ring buffer index out of range')
+        if self.is_full:
+            index = (self.head + index) % self.size
+        return self.data[index]
+
+    def append(self, value):
+        if self.is_full:
+            old_value = self.data[self.head]
+            old_mean = self.mean
+            self.mean += (value - old_value)/self.size
+            self._m2 += (value - old_value)*(value - self.mean + old_value - old_mean)
+            self._m2 = max(self._m2, 0.0)
+            if old_value == self._min:
+                self._min_stale = True
+            if old_value == self._max:
+                self._max_stale = True
+        else:
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta/self.count
+            self._m2 += delta*(value - self.mean)
+
+        if self._min is None or value <= self._min:
+            self._min = value
+            self._min_stale = False
+        if self._max is None or value >= self._max:
+            self._max = value
+            self._max_stale = False
+
+        self.data[self.head] = value
+        self.head = (self.head + 1) % self.size
+        if self.head == 0:
+            self.mean = float(np.mean(self.data))
+            self._m2 = float(np.std(self.data))**2*self.size
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        return self._m2/(self.count - 1)
+
+    @property
+    def std(self):
+        return self.variance**0.5
+
+    @property
+    def min(self):
+        if self._min_stale:
+            self._min = float(np.min(self.values))
+            self._min_stale = False
+        return self._min
+
+    @property
+    def max(self):
+        if self._max_stale:
+            self._max = float(np.max(self.values))
+            self._max_stale = False
+        return self._max
+
+    @property
+    def median(self):
+        if not self.count:
+            return None
+        return float(np.median(self.values))
+
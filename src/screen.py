@@ -0,0 +1,68 @@
+import board
+import displayio
+import constants
+
+
+class Screen:
+
+    # Base class for the display screens. Label text and colors are only
+    # assigned when they change, as each assignment makes the label redo its
+    # glyph layout, and the screen is marked dirty when they do. Display auto
+    # refresh is turned off and show() refreshes the display only when the
+    # screen has changed or a different screen is being shown.
+
+    BACKGROUND_TILE_SIZE = 16
+
+    shown = None
+    palette = None
+    background_bitmap = None
+
+    def __init__(self):
+        self.is_dirty = True
+
+    def create_background(self):
+        # Black background tiled from one small bitmap and palette shared by
+        # all screens, rather than a full display bitmap per screen. Each 
+        # screen gets its own TileGrid as a TileGrid can only be in one group.
+        size = self.BACKGROUND_TILE_SIZE
+        if Screen.palette is None:
+            Screen.palette = displayio.Palette(len(constants.COLOR_TO_RGB))
+            for i, rgb in enumerate(constants.COLOR_TO_RGB.values()):
+                Screen.palette[i] = rgb
+            Screen.background_bitmap = displayio.Bitmap(size, size, len(constants.COLOR_TO_RGB))
+            black_index = list(constants.COLOR_TO_RGB).index('black')
+            Screen.background_bitmap.fill(black_index)
+        tile_grid = displayio.TileGrid(
+                Screen.background_bitmap,
+                pixel_shader = Screen.palette,
+                width = (board.DISPLAY.width + size - 1)//size,
+                height = (board.DISPLAY.height + size - 1)//size,
+                tile_width = size,
+                tile_height = size,
+                )
+        return tile_grid
+
+    def set_text(self, text_label, text):
+        if text_label.text != text:
+            text_label.text = text
+            self.is_dirty = True
+
+    def set_color(self, text_label, color):
+        if text_label.color != color:
+            text_label.color = color
+            self.is_dirty = True
+
+    def set_background_color(self, text_label, color):
+        if text_label.background_color != color:
+            text_label.background_color = color
+            self.is_dirty = True
+
+    def show(self):
+        if Screen.shown is not self:
+            board.DISPLAY.show(self.group)
+            Screen.shown = self
+            self.is_dirty = True
+        if self.is_dirty:
+            board.DISPLAY.refresh(target_frames_per_second=None, minimum_frames_per_second=0)
+            self.is_dirty = False
+
@@ -0,0 +1,48 @@
+import gc
+import constants
+from screen import Screen
+
+
+class ScreenManager:
+
+    # Screens are constructed the first time they are used rather than all
+    # at boot. Screens registered as releasable, e.g. rarely used ones like
+    # the message screen, are dropped when free memory runs low and rebuilt
+    # on their next use. 
+
+    def __init__(self):
+        self.factories = {}
+        self.releasable = []
+        self.screens = {}
+
+    def register(self, name, factory, releasable=False):
+        self.factories[name] = factory
+        if releasable:
+            self.releasable.append(name)
+
+    def get(self, name):
+        try:
+            screen = self.screens[name]
+        except KeyError:
+            screen = self.factories[name]()
+            self.screens[name] = screen
+        return screen
+
+    def is_built(self, name):
+        return name in self.screens
+
+    def release_unused(self, min_free=constants.SCREEN_RELEASE_MEM_FREE):
+        # Release releasable screens, other than the one shown, if free 
+        # memory is below min_free. Returns True if any were released.
+        if gc.mem_free() >= min_free:
+            return False
+        released = False
+        for name in self.releasable:
+            screen = self.screens.get(name, None)
+            if screen is not None and screen is not Screen.shown:
+                del self.screens[name]
+                released = True
+        if released:
+            gc.collect()
+        return released
+
@@ -0,0 +1,36 @@
+# Tests run the hardware independent modules under desktop python. The
+# CircuitPython modules they import are replaced by minimal stand-ins when
+# they aren't installed: numpy for ulab.numpy and constants only for board
+# and adafruit_tsl2591. The source directory is appended to the path, not
+# prepended, as src/code.py would hide the standard library code module.
+import os
+import sys
+import types
+
+sys.path.append(os.path.join(os.path.dirname(__file__), os.pardir, 'src'))
+
+try:
+    import ulab
+except ImportError:
+    import numpy
+    ulab = types.ModuleType('ulab')
+    ulab.numpy = numpy
+    sys.modules['ulab'] = ulab
+    sys.modules['ulab.numpy'] = numpy
+
+try:
+    import board
+except ImportError:
+    board = types.ModuleType('board')
+    board.A6 = None
+    sys.modules['board'] = board
+
+try:
+    import adafruit_tsl2591
+except ImportError:
+    adafruit_tsl2591 = types.ModuleType('adafruit_tsl2591')
+    for i, gain in enumerate(('LOW', 'MED', 'HIGH', 'MAX')):
+        setattr(adafruit_tsl2591, f'GAIN_{gain}', 0x10*i)
+    for i in range(6):
+        setattr(adafruit_tsl2591, f'INTEGRATIONTIME_{100*(i+1)}MS', i)
+    sys.modules['adafruit_tsl2591'] = adafruit_tsl2591
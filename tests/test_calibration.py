@@ -0,0 +1,124 @@
+import pytest
+import constants
+from calibrations import Calibration
+from calibrations import CalibrationGroup
+from calibrations import CalibrationsError
+
+
+def test_linear_apply():
+    calibration = Calibration('lin', {'fit_type': 'linear', 'fit_coef': [2.0, 0.5]})
+    assert calibration.apply(1.5) == pytest.approx(3.5)
+    assert calibration.range_min is None
+    assert calibration.is_inside_range(100.0)
+
+
+def test_polynomial_apply_highest_order_first():
+    data = {
+            'fit_type': 'polynomial', 
+            'fit_coef': [3.0, -1.0, 2.0], 
+            'range': {'min': 0.0, 'max': 2.0},
+            }
+    calibration = Calibration('poly', data)
+    assert calibration.apply(0.5) == pytest.approx(3.0*0.25 - 0.5 + 2.0)
+
+
+def test_out_of_range_is_none():
+    data = {'fit_type': 'linear', 'fit_coef': [1.0, 0.0], 'range': {'min': 0.1, 'max': 1.0}}
+    calibration = Calibration('lin', data)
+    assert calibration.apply(0.05) is None
+    assert calibration.apply(1.5) is None
+    assert calibration.apply(0.1) == pytest.approx(0.1)
+    assert calibration.apply(1.0) == pytest.approx(1.0)
+
+
+def test_sensor_settings_and_units():
+    data = {
+            'fit_type': 'linear', 
+            'fit_coef': [1.0, 0.0], 
+            'units': 'ppm', 
+            'led': 'red',
+            'gain': 'high', 
+            'integration_time': '300ms',
+            }
+    calibration = Calibration('lin', data)
+    assert calibration.units == 'ppm'
+    assert calibration.led == 'red'
+    assert calibration.gain == constants.STR_TO_GAIN['high']
+    assert calibration.integration_time == constants.STR_TO_INTEGRATION_TIME['300ms']
+
+
+def test_unknown_fit_type_raises_on_apply():
+    calibration = Calibration('bad', {'fit_type': 'spline', 'fit_coef': [1.0]})
+    with pytest.raises(CalibrationsError):
+        calibration.apply(0.5)
+
+
+def test_group_matches_individual_calibrations():
+    calibration_list = [
+            Calibration('a', {'fit_type': 'linear', 'fit_coef': [2.0, 1.0]}),
+            Calibration('b', {
+                'fit_type': 'polynomial', 
+                'fit_coef': [0.5, -1.0, 3.0, 0.25], 
+                'range': {'min': 0.0, 'max': 1.0},
+                }),
+            Calibration('c', {
+                'fit_type': 'linear', 
+                'fit_coef': [4.0], 
+                'range': {'min': 0.2, 'max': 0.4},
+                }),
+            ]
+    group = CalibrationGroup(calibration_list)
+    assert len(group) == 3
+    assert group.names == ['a', 'b', 'c']
+    for absorbance in (0.0, 0.3, 0.9, 1.5):
+        values = group.apply(absorbance)
+        for value, calibration in zip(values, calibration_list):
+            expected = calibration.apply(absorbance)
+            if expected is None:
+                assert value is None
+            else:
+                assert value == pytest.approx(expected)
+
+
+TABLE_DATA = {
+        'fit_type': 'table',
+        'fit_table': [[0.0, 0.0], [0.5, 1.0], [1.0, 3.0], [2.0, 4.0]],
+        'range': {'min': 0.0, 'max': 2.0},
+        }
+
+
+def test_table_slopes():
+    calibration = Calibration('table', TABLE_DATA)
+    assert calibration.table_x == (0.0, 0.5, 1.0, 2.0)
+    assert calibration.table_slope == pytest.approx((2.0, 4.0, 1.0))
+
+
+@pytest.mark.parametrize('absorbance, segment', [
+    (0.0, 0), (0.25, 0), (0.5, 1), (0.99, 1), (1.0, 2), (1.7, 2), (2.0, 2),
+    ])
+def test_find_segment(absorbance, segment):
+    calibration = Calibration('table', TABLE_DATA)
+    assert calibration.find_segment(absorbance) == segment
+
+
+@pytest.mark.parametrize('absorbance, value', [
+    (0.0, 0.0), (0.25, 0.5), (0.5, 1.0), (0.75, 2.0), (1.5, 3.5), (2.0, 4.0),
+    ])
+def test_table_apply_interpolates(absorbance, value):
+    calibration = Calibration('table', TABLE_DATA)
+    assert calibration.apply(absorbance) == pytest.approx(value)
+
+
+def test_table_apply_outside_range_is_none():
+    calibration = Calibration('table', TABLE_DATA)
+    assert calibration.apply(-0.1) is None
+    assert calibration.apply(2.1) is None
+
+
+def test_group_with_table():
+    calibration_list = [
+            Calibration('table', TABLE_DATA),
+            Calibration('lin', {'fit_type': 'linear', 'fit_coef': [1.0, 0.0]}),
+            ]
+    group = CalibrationGroup(calibration_list)
+    assert group.apply(0.75) == pytest.approx([2.0, 0.75])
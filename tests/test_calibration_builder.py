@@ -0,0 +1,75 @@
+import numpy
+import pytest
+from calibration_builder import CalibrationBuilder
+from calibration_builder import CalibrationBuilderError
+from calibrations import Calibrations
+
+
+def test_linear_fit_exact():
+    builder = CalibrationBuilder('linear')
+    for absorbance in (0.1, 0.4, 0.8):
+        builder.add(absorbance, 2.0*absorbance + 0.5)
+    coef = builder.solve()
+    assert coef == pytest.approx([2.0, 0.5])
+    assert builder.r_squared(coef) == pytest.approx(1.0)
+    assert builder.residuals(coef) == pytest.approx([0.0, 0.0, 0.0], abs=1e-9)
+
+
+def test_polynomial_fit_exact():
+    builder = CalibrationBuilder('polynomial')
+    for absorbance in (0.0, 0.5, 1.0, 1.5):
+        builder.add(absorbance, 3.0*absorbance**2 - absorbance + 1.0)
+    assert builder.solve() == pytest.approx([3.0, -1.0, 1.0])
+
+
+def test_least_squares_matches_numpy():
+    points = [(0.1, 1.1), (0.3, 2.2), (0.5, 2.9), (0.8, 4.8), (1.1, 5.9)]
+    builder = CalibrationBuilder('linear')
+    for absorbance, value in points:
+        builder.add(absorbance, value)
+    x, y = zip(*points)
+    assert builder.solve() == pytest.approx(list(numpy.polyfit(x, y, 1)))
+
+
+def test_remove_last_undoes_add():
+    builder = CalibrationBuilder('linear')
+    builder.add(0.1, 1.0)
+    builder.add(0.5, 3.0)
+    builder.add(0.9, 100.0)
+    builder.remove_last()
+    assert builder.num_points == 2
+    assert builder.solve() == pytest.approx([5.0, 0.5])
+
+
+def test_change_fit_type_keeps_points():
+    builder = CalibrationBuilder('linear')
+    for absorbance in (0.0, 0.5, 1.0):
+        builder.add(absorbance, absorbance**2)
+    builder.set_fit_type('polynomial')
+    assert builder.num_points == 3
+    assert builder.solve() == pytest.approx([1.0, 0.0, 0.0], abs=1e-9)
+
+
+def test_too_few_standards():
+    builder = CalibrationBuilder('polynomial')
+    builder.add(0.1, 1.0)
+    builder.add(0.2, 2.0)
+    with pytest.raises(CalibrationBuilderError):
+        builder.solve()
+
+
+def test_singular_fit():
+    builder = CalibrationBuilder('linear')
+    builder.add(0.3, 1.0)
+    builder.add(0.3, 2.0)
+    with pytest.raises(CalibrationBuilderError):
+        builder.solve()
+
+
+def test_calibration_data_passes_checks():
+    builder = CalibrationBuilder('linear')
+    builder.add(0.2, 1.0)
+    builder.add(0.6, 3.0)
+    data = builder.calibration_data(builder.solve(), units='ppm', led='red')
+    assert data['range'] == {'min': 0.2, 'max': 0.6}
+    assert Calibrations().check_calibration('new', data) == []
@@ -0,0 +1,370 @@
+import io
+import os
+import json
+import pytest
+import calibrations
+from calibrations import Calibrations
+from calibrations import CalibrationsError
+
+
+LINEAR = {'fit_type': 'linear', 'fit_coef': [2.0, 0.0], 'units': 'ppm', 'led': 'red'}
+POLY = {
+        'fit_type': 'polynomial', 
+        'fit_coef': [1.0, 2.0, 3.0], 
+        'range': {'min': 0.0, 'max': 1.0},
+        'led': 'red',
+        }
+BAD = {'fit_type': 'spline', 'fit_coef': [1.0]}
+
+
+@pytest.fixture
+def in_tmp_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def read_only(monkeypatch):
+    # Compiled file can't be written, calibrations are indexed in the json
+    def open_read_only(name, mode='r', *args, **kwargs):
+        if name.startswith(Calibrations.COMPILED_FILE_NAME) and 'w' in mode:
+            raise OSError(30, 'read only filesystem')
+        return open(name, mode, *args, **kwargs)
+    monkeypatch.setattr(calibrations, 'open', open_read_only, raising=False)
+
+
+def write_file(text):
+    with open(Calibrations.FILE_NAME, 'w') as f:
+        f.write(text)
+
+
+def read_file():
+    with open(Calibrations.FILE_NAME, 'r') as f:
+        return f.read()
+
+
+def load():
+    cals = Calibrations()
+    cals.load()
+    return cals
+
+
+# Scanner
+# -----------------------------------------------------------------------------
+
+SCAN_TEXT = (
+        '{\n'
+        '  "a {\\"quoted\\"}": {"fit_type": "linear", "fit_coef": [1, 2], "units": "}{,:"},\n'
+        '  "b": {"fit_type": "table", "fit_table": [[0, 0], [1, 2]], "range": {"min": 0, "max": 1}},\n'
+        '  "c": {"fit_type": "spline", "fit_coef": [1]}\n'
+        '}\n'
+        )
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 256])
+def test_scan_spans_parse_to_values(chunk_size, monkeypatch):
+    monkeypatch.setattr(Calibrations, 'SCAN_CHUNK_SIZE', chunk_size)
+    cals = Calibrations()
+    file_bytes = SCAN_TEXT.encode()
+    index = cals.scan(io.BytesIO(file_bytes))
+    expected = json.loads(SCAN_TEXT)
+    assert [name for name, info in index] == ['a {"quoted"}', 'b']
+    for name, (offset, length, led) in index:
+        assert json.loads(file_bytes[offset:offset + length]) == expected[name]
+    assert list(cals.error_dict) == ['c']
+    assert cals.end_offset == SCAN_TEXT.rindex('}')
+    assert cals.has_members
+
+
+def test_scan_empty_object():
+    cals = Calibrations()
+    assert cals.scan(io.BytesIO(b' { } ')) == []
+    assert cals.end_offset == 3
+    assert not cals.has_members
+
+
+@pytest.mark.parametrize('text', ['[1, 2]', '{"a": {}} x'])
+def test_scan_incorrect_format(text):
+    with pytest.raises(CalibrationsError):
+        Calibrations().scan(io.BytesIO(text.encode()))
+
+
+@pytest.mark.parametrize('text', ['{"a": {"fit_type": "linear"', '', '{"a": "b'])
+def test_scan_unexpected_end(text):
+    with pytest.raises(ValueError):
+        Calibrations().scan(io.BytesIO(text.encode()))
+
+
+def test_index_entry_valid_and_invalid():
+    cals = Calibrations()
+    index = []
+    cals.index_entry(index, 'lin', bytearray(json.dumps(LINEAR).encode()), 10, 50)
+    cals.index_entry(index, 'bad', bytearray(json.dumps(BAD).encode()), 60, 90)
+    assert index == [('lin', (10, 40, 'red'))]
+    assert list(cals.error_dict) == ['bad']
+    assert cals.all_units == ['ppm']
+
+
+# Loading
+# -----------------------------------------------------------------------------
+
+def test_load_compiled_and_scanned_agree(in_tmp_path, read_only, monkeypatch):
+    write_file(json.dumps({'lin': LINEAR, 'poly': POLY, 'bad': BAD}))
+    scanned = load()
+    assert not scanned.is_compiled_index
+    monkeypatch.delattr(calibrations, 'open')
+    compiled = load()
+    assert compiled.is_compiled_index
+    assert list(scanned.data) == list(compiled.data) == ['lin', 'poly']
+    assert list(scanned.error_dict) == list(compiled.error_dict) == ['bad']
+    assert scanned.end_offset == compiled.end_offset
+    for name in ('lin', 'poly'):
+        assert scanned.apply(name, 0.5) == pytest.approx(compiled.apply(name, 0.5))
+    assert scanned.names_for_led('red') == ['lin', 'poly']
+
+
+def test_load_missing_file(in_tmp_path):
+    cals = load()
+    assert not cals.data
+    assert cals.end_offset is None
+
+
+@pytest.mark.parametrize('text', ['{"a": ', '[]'])
+def test_load_unparsable_file(in_tmp_path, text):
+    write_file(text)
+    with pytest.raises(CalibrationsError):
+        load()
+
+
+# Adding calibrations
+# -----------------------------------------------------------------------------
+
+@pytest.fixture(params=['compiled', 'read_only'])
+def fs_mode(request, in_tmp_path):
+    if request.param == 'read_only':
+        request.getfixturevalue('read_only')
+    return request.param
+
+
+def test_add_creates_missing_file(fs_mode):
+    cals = load()
+    cals.add('new', LINEAR)
+    assert json.loads(read_file()) == {'new': LINEAR}
+    assert list(cals.data) == ['new']
+    assert cals.apply('new', 1.0) == pytest.approx(2.0)
+
+
+def test_add_to_empty_object(fs_mode):
+    write_file('{}\n')
+    cals = load()
+    cals.add('new', LINEAR)
+    assert json.loads(read_file()) == {'new': LINEAR}
+    assert cals.apply('new', 1.0) == pytest.approx(2.0)
+
+
+def test_add_appends_and_keeps_existing(fs_mode):
+    write_file(json.dumps({'lin': LINEAR}, indent=4) + '\n')
+    cals = load()
+    cals.add('poly', POLY)
+    cals.add('poly 2', POLY)
+    assert json.loads(read_file()) == {'lin': LINEAR, 'poly': POLY, 'poly 2': POLY}
+    assert list(cals.data) == ['lin', 'poly', 'poly 2']
+    assert cals.apply('poly', 1.0) == pytest.approx(6.0)
+    assert load().apply('poly 2', 1.0) == pytest.approx(6.0)
+
+
+def test_add_after_errors_popped(fs_mode):
+    # File with only invalid entries still needs a separator
+    write_file(json.dumps({'bad': BAD}))
+    cals = load()
+    assert not cals.data
+    while cals.has_errors:
+        cals.pop_error()
+    cals.add('new', LINEAR)
+    assert json.loads(read_file()) == {'bad': BAD, 'new': LINEAR}
+
+
+@pytest.mark.parametrize('text', ['{"lin": {"fit_type": "linear", ', '[1, 2, 3]'])
+def test_add_leaves_unparsable_file(in_tmp_path, text):
+    write_file(text)
+    cals = Calibrations()
+    with pytest.raises(CalibrationsError):
+        cals.load()
+    with pytest.raises(CalibrationsError):
+        cals.add('new', LINEAR)
+    assert read_file() == text
+
+
+def test_add_invalid_calibration(in_tmp_path):
+    cals = load()
+    with pytest.raises(CalibrationsError):
+        cals.add('bad', BAD)
+
+
+def test_new_name(in_tmp_path):
+    write_file(json.dumps({'Custom 1': LINEAR, 'Custom 2': LINEAR}))
+    assert load().new_name('Custom') == 'Custom 3'
+
+
+# Compiled file
+# -----------------------------------------------------------------------------
+
+TABLE = {
+        'fit_type': 'table',
+        'fit_table': [[0.0, 0.0], [0.5, 1.25], [1.0, 3.0]],
+        'range': {'min': 0.0, 'max': 1.0},
+        'units': 'µg/L',
+        'led': 'green',
+        'gain': 'high',
+        'integration_time': '300ms',
+        }
+
+
+@pytest.mark.parametrize('name, data', [
+    ('lin', LINEAR), ('poly', POLY), ('Nitrate µ', TABLE), ('bare', {'fit_type': 'linear', 'fit_coef': [1]}),
+    ])
+def test_pack_unpack_round_trip(name, data):
+    cals = Calibrations()
+    unpacked = cals.unpack(cals.pack(name, data))
+    expected = dict(data)
+    if 'fit_table' in expected:
+        expected['fit_table'] = [tuple(point) for point in expected['fit_table']]
+    assert unpacked == expected
+
+
+def test_pack_str_none_and_too_long():
+    cals = Calibrations()
+    buf = bytearray()
+    cals.pack_str(buf, None)
+    cals.pack_str(buf, 'é'*127)
+    assert buf[0] == Calibrations.NONE_LENGTH
+    assert buf[1] == 254
+    with pytest.raises(ValueError):
+        cals.pack_str(bytearray(), 'x'*255)
+
+
+def test_short_str_keeps_whole_characters():
+    value = Calibrations().short_str('é'*200)
+    assert value == 'é'*127
+    assert len(value.encode()) < Calibrations.NONE_LENGTH
+
+
+@pytest.mark.parametrize('key', ['name', 'led', 'units'])
+def test_strings_too_long_to_pack_rejected(in_tmp_path, key):
+    long_str = 'é'*128
+    data = dict(LINEAR)
+    name = 'cal'
+    if key == 'name':
+        name = long_str
+    else:
+        data[key] = long_str
+    write_file(json.dumps({name: data, 'ok': POLY}))
+    cals = load()
+    assert list(cals.data) == ['ok']
+    assert cals.has_errors
+    # Errors, shortened to fit, survive a load from the compiled file
+    compiled = load()
+    assert compiled.is_compiled_index
+    assert list(compiled.data) == ['ok']
+    assert len(compiled.error_dict) == 1
+
+
+def test_compiled_file_reused_until_json_changes(in_tmp_path):
+    write_file(json.dumps({'lin': LINEAR}))
+    load()
+    cals = load()
+    assert cals.is_compiled_index
+    # Same size and mtime but different content, caught by the crc
+    stat = os.stat(Calibrations.FILE_NAME)
+    write_file(json.dumps({'lin': LINEAR}).replace('2.0', '3.0'))
+    os.utime(Calibrations.FILE_NAME, (stat.st_atime, stat.st_mtime))
+    assert load().apply('lin', 1.0) == pytest.approx(3.0)
+
+
+@pytest.mark.parametrize('offset, value', [(0, b'XXXX'), (4, b'\x63')])
+def test_compiled_header_mismatch_rebuilds(in_tmp_path, offset, value):
+    write_file(json.dumps({'lin': LINEAR}))
+    load()
+    with open(Calibrations.COMPILED_FILE_NAME, 'r+b') as f:
+        f.seek(offset)
+        f.write(value)
+    cals = Calibrations()
+    assert not cals.load_compiled()
+    assert load().apply('lin', 1.0) == pytest.approx(2.0)
+
+
+def test_truncated_compiled_file_rebuilds(in_tmp_path):
+    write_file(json.dumps({'lin': LINEAR, 'poly': POLY}))
+    load()
+    with open(Calibrations.COMPILED_FILE_NAME, 'r+b') as f:
+        f.truncate(40)
+    cals = Calibrations()
+    assert not cals.load_compiled()
+    assert list(load().data) == ['lin', 'poly']
+
+
+def test_compiled_units_and_members(in_tmp_path):
+    write_file(json.dumps({'lin': LINEAR, 'table': TABLE, 'bad': BAD}))
+    parsed = load()
+    compiled = load()
+    assert compiled.is_compiled_index
+    assert parsed.all_units == compiled.all_units == ['ppm', 'µg/L']
+    assert compiled.has_members
+
+
+def test_compile_parses_one_entry_at_a_time(in_tmp_path, monkeypatch):
+    # The whole file is never parsed at once, only each entry's span
+    write_file(json.dumps({'lin': LINEAR, 'poly': POLY, 'bad': BAD}))
+    json_loads = json.loads
+    def loads_entry(text):
+        assert not text.lstrip().startswith('{"lin"')
+        return json_loads(text)
+    monkeypatch.setattr(calibrations.json, 'load', None)
+    monkeypatch.setattr(calibrations.json, 'loads', loads_entry)
+    cals = load()
+    assert cals.is_compiled_index
+    assert list(cals.data) == ['lin', 'poly']
+    assert list(cals.error_dict) == ['bad']
+    assert cals.apply('poly', 1.0) == pytest.approx(6.0)
+
+
+@pytest.mark.parametrize('mode', ['compiled', 'read_only'])
+def test_crc_not_read_without_matching_compiled_file(in_tmp_path, request, mode, monkeypatch):
+    # Without a compiled file to validate, the json file is read only once
+    if mode == 'read_only':
+        request.getfixturevalue('read_only')
+    write_file(json.dumps({'lin': LINEAR}))
+    monkeypatch.setattr(Calibrations, 'file_crc', None)
+    cals = load()
+    assert cals.is_compiled_index == (mode == 'compiled')
+    assert cals.apply('lin', 1.0) == pytest.approx(2.0)
+
+
+def test_scan_crc_matches_file_crc(in_tmp_path):
+    write_file(SCAN_TEXT)
+    cals = load()
+    assert cals.scan_crc == cals.file_crc()
+    assert load().is_compiled_index
+
+
+@pytest.mark.parametrize('text', ['{"lin": ', '{"lin": {"fit_type": "linear"'])
+def test_failed_load_keeps_compiled_file(in_tmp_path, text):
+    # A reload that fails leaves the file the current calibrations index
+    write_file(json.dumps({'lin': LINEAR, 'poly': POLY}))
+    current = load()
+    assert current.is_compiled_index
+    write_file(text)
+    with pytest.raises(CalibrationsError):
+        load()
+    assert not Calibrations.COMPILED_TEMP_FILE_NAME in os.listdir()
+    assert current.apply('poly', 1.0) == pytest.approx(6.0)
+
+
+def test_compiled_file_replaced_on_success(in_tmp_path):
+    write_file(json.dumps({'lin': LINEAR}))
+    load()
+    write_file(json.dumps({'lin': LINEAR, 'poly': POLY}))
+    cals = load()
+    assert cals.is_compiled_index
+    assert sorted(os.listdir()) == [Calibrations.COMPILED_FILE_NAME, Calibrations.FILE_NAME]
+    assert cals.apply('poly', 1.0) == pytest.approx(6.0)
@@ -0,0 +1,109 @@
+import pytest
+import constants
+from blank_cache import BlankCache
+from gain_ratio_meter import GainRatioMeter
+
+
+LOW = constants.STR_TO_GAIN['low']
+MED = constants.STR_TO_GAIN['med']
+HIGH = constants.STR_TO_GAIN['high']
+T100 = constants.STR_TO_INTEGRATION_TIME['100ms']
+T200 = constants.STR_TO_INTEGRATION_TIME['200ms']
+MAX_COUNTS = 36863
+
+
+class Sample:
+
+    # Minimal light sensor sample, normalized by a given factor
+
+    def __init__(self, counts, gain, integration_time=T100, factor=1.0):
+        self.counts = counts
+        self.gain = gain
+        self.integration_time = integration_time
+        self.max_counts = MAX_COUNTS
+        self.normalized = counts/factor
+
+    @property
+    def is_overflow(self):
+        return self.counts >= self.max_counts
+
+
+# BlankCache
+# -----------------------------------------------------------------------------
+
+def test_blank_not_used_at_other_gain_without_ratio():
+    cache = BlankCache()
+    cache.set(MED, T100, 100.0)
+    assert cache.get(MED, T100) == 100.0
+    assert cache.get(MED, T200) == 100.0
+    assert cache.get(HIGH, T100) is None
+
+
+def test_blank_scaled_by_measured_ratio():
+    cache = BlankCache()
+    cache.set(MED, T100, 100.0)
+    # Same light reads 2% low at high gain once nominally normalized
+    cache.set_gain_ratio(MED, 50.0, HIGH, 49.0)
+    assert cache.has_gain_ratio(HIGH, MED)
+    assert cache.get(HIGH, T200) == pytest.approx(98.0)
+    # Ratios chain through a gain with a known scale
+    cache.set_gain_ratio(LOW, 10.0, MED, 11.0)
+    assert cache.get(LOW, T100) == pytest.approx(100.0*10.0/11.0)
+
+
+def test_most_recent_blank_preferred_and_ratios_kept_on_clear():
+    cache = BlankCache()
+    cache.set_gain_ratio(MED, 1.0, HIGH, 1.0)
+    cache.set(MED, T100, 100.0)
+    cache.set(MED, T200, 90.0)
+    assert cache.get(HIGH, T100) == pytest.approx(90.0)
+    cache.clear()
+    assert cache.get(HIGH, T100) is None
+    assert cache.has_gain_ratio(MED, HIGH)
+
+
+# GainRatioMeter
+# -----------------------------------------------------------------------------
+
+def test_ratio_measured_across_switch_on_steady_light():
+    cache = BlankCache()
+    meter = GainRatioMeter(cache)
+    meter.add(Sample(2000, MED))
+    assert meter.hold(Sample(2000, MED), HIGH)
+    meter.add(Sample(2004, MED))
+    assert not meter.hold(Sample(2004, MED), HIGH)
+    meter.add(Sample(30000, HIGH, factor=15.0))
+    assert not cache.has_gain_ratio(MED, HIGH)
+    meter.add(Sample(30000, HIGH, factor=15.0))
+    assert cache.gain_scale[HIGH]/cache.gain_scale[MED] == pytest.approx(2000.0/2002.0)
+    # Not held once the ratio is known
+    meter.add(Sample(30000, HIGH, factor=15.0))
+    assert not meter.hold(Sample(30000, HIGH, factor=15.0), MED)
+
+
+def test_unsteady_light_held_at_most_max_holds():
+    cache = BlankCache()
+    meter = GainRatioMeter(cache)
+    counts = 2000
+    for i in range(GainRatioMeter.MAX_HOLDS):
+        counts += 500
+        meter.add(Sample(counts, MED))
+        assert meter.hold(Sample(counts, MED), HIGH)
+    meter.add(Sample(counts + 500, MED))
+    assert not meter.hold(Sample(counts + 500, MED), HIGH)
+    for i in range(3):
+        meter.add(Sample(30000, HIGH))
+    assert not cache.has_gain_ratio(MED, HIGH)
+
+
+@pytest.mark.parametrize('counts', [MAX_COUNTS, GainRatioMeter.MIN_COUNTS - 1])
+def test_no_hold_when_ratio_cant_be_measured(counts):
+    meter = GainRatioMeter(BlankCache())
+    meter.add(Sample(counts, MED))
+    assert not meter.hold(Sample(counts, MED), LOW)
+
+
+def test_no_hold_for_integration_time_switch():
+    meter = GainRatioMeter(BlankCache())
+    meter.add(Sample(2000, MED))
+    assert not meter.hold(Sample(2000, MED), MED)
@@ -0,0 +1,86 @@
+import pytest
+from menu_model import MenuModel
+
+
+ITEMS = ['Absorbance', 'Ammonia', 'Blue 1', 'Blue 2', 'Copper', 'Nitrate', 'Nitrite', 'About']
+
+
+@pytest.fixture
+def menu():
+    menu = MenuModel(items_per_screen=3)
+    menu.set_items(list(ITEMS), [f'{i} {item}' for i, item in enumerate(ITEMS)])
+    return menu
+
+
+def test_initial_view(menu):
+    assert len(menu) == len(ITEMS)
+    assert menu.selected == 'Absorbance'
+    assert menu.cursor == 0
+    assert menu.view_texts == ['0 Absorbance', '1 Ammonia', '2 Blue 1']
+
+
+def test_move_scrolls_minimum_amount(menu):
+    menu.move(3)
+    assert menu.selected == 'Blue 2'
+    assert menu.cursor == 2
+    assert menu.view_texts[0] == '1 Ammonia'
+    menu.move(-1)
+    assert menu.cursor == 1
+    assert menu.view_texts[0] == '1 Ammonia'
+
+
+def test_move_clamps_at_ends(menu):
+    menu.move(-5)
+    assert menu.selected == 'Absorbance'
+    menu.move(100)
+    assert menu.selected == 'About'
+    assert menu.view_texts == ['5 Nitrate', '6 Nitrite', '7 About']
+
+
+def test_page(menu):
+    menu.page(1)
+    assert menu.selected == 'Blue 2'
+    assert menu.cursor == 0
+    menu.page(1)
+    menu.page(1)
+    assert menu.selected == 'About'
+    assert len(menu.view_texts) == 3
+    menu.page(-1)
+    menu.page(-1)
+    menu.page(-1)
+    assert menu.selected == 'Absorbance'
+    assert menu.cursor == 0
+
+
+def test_jump_next_letter_wraps(menu):
+    visited = []
+    for i in range(6):
+        menu.jump_next_letter()
+        visited.append(menu.selected)
+    assert visited == ['Blue 1', 'Copper', 'Nitrate', 'About', 'Absorbance', 'Blue 1']
+    assert menu.cursor == 0
+
+
+def test_select_and_set_items_keep_position(menu):
+    menu.select('Nitrite')
+    assert menu.selected == 'Nitrite'
+    menu.select('Missing')
+    assert menu.selected == 'Nitrite'
+    menu.set_items(ITEMS[:3], ITEMS[:3])
+    assert menu.selected == 'Blue 1'
+
+
+def test_items_per_screen_change(menu):
+    menu.move(7)
+    menu.set_items_per_screen(5)
+    assert menu.view_texts[-1] == '7 About'
+    assert len(menu.view_texts) == 5
+
+
+def test_empty_menu():
+    menu = MenuModel(items_per_screen=3)
+    menu.set_items([], [])
+    menu.move(1)
+    menu.page(1)
+    menu.jump_next_letter()
+    assert menu.view_texts == []
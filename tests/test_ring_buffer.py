@@ -0,0 +1,67 @@
+import numpy
+import pytest
+from ring_buffer import RingBuffer
+
+
+def test_empty():
+    buf = RingBuffer(4)
+    assert len(buf) == 0
+    assert not buf.is_full
+    assert buf.std == 0.0
+    assert buf.median is None
+
+
+def test_partial_fill():
+    buf = RingBuffer(5)
+    for value in (1.0, 4.0, 2.0):
+        buf.append(value)
+    assert len(buf) == 3
+    assert list(buf.values) == [1.0, 4.0, 2.0]
+    assert buf.mean == pytest.approx(7.0/3.0)
+    assert buf.std == pytest.approx(numpy.std([1.0, 4.0, 2.0], ddof=1))
+    assert buf.min == 1.0
+    assert buf.max == 4.0
+    assert buf.median == 2.0
+
+
+def test_indexing_oldest_to_newest_after_wrap():
+    buf = RingBuffer(3)
+    for value in range(5):
+        buf.append(float(value))
+    assert [buf[i] for i in range(3)] == [2.0, 3.0, 4.0]
+    assert buf[-1] == 4.0
+    with pytest.raises(IndexError):
+        buf[3]
+
+
+def test_windowed_statistics_match_numpy():
+    rng = numpy.random.default_rng(1)
+    values = rng.normal(10.0, 2.0, 57)
+    buf = RingBuffer(10)
+    for n, value in enumerate(values, 1):
+        buf.append(float(value))
+        window = values[max(n - 10, 0):n]
+        assert buf.mean == pytest.approx(numpy.mean(window))
+        if len(window) > 1:
+            assert buf.std == pytest.approx(numpy.std(window, ddof=1))
+        assert buf.min == pytest.approx(numpy.min(window))
+        assert buf.max == pytest.approx(numpy.max(window))
+
+
+def test_min_max_recomputed_when_extreme_leaves_window():
+    buf = RingBuffer(3)
+    for value in (9.0, 1.0, 5.0, 4.0, 6.0):
+        buf.append(value)
+    assert buf.min == 4.0
+    assert buf.max == 6.0
+
+
+def test_clear():
+    buf = RingBuffer(3)
+    for value in (1.0, 2.0, 3.0, 4.0):
+        buf.append(value)
+    buf.clear()
+    assert len(buf) == 0
+    buf.append(7.0)
+    assert buf.mean == 7.0
+    assert buf.min == buf.max == 7.0